@@ -0,0 +1,193 @@
+"""Statistics over years of manpower with NumPy.
+
+The daily rollup, which holds the details already summed per day,
+project and designation, is read once into int32 arrays. Everything
+else is computed on the arrays: totals per project or designation,
+daily series, rolling averages, absence rates and percentiles. The
+arrays are kept in the aggregate cache, so once loaded a question about
+the whole history takes milliseconds, until manpower is changed.
+
+The arrays are mapped from the snapshot files of snapshot.py, which
+only have to read the days changed since the last run from the
+database.
+
+Nothing here imports tkinter, the module works on a server as well.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+from dtbase.dtbase import DailyRollup
+from dtbase.cache import AGGREGATES
+from dtbase.lookup import PROJECTS, DESIGNATIONS
+import snapshot
+
+FIELDS = ('present', 'absent', 'vacation')
+# Dimensions the statistics can be grouped by.
+GROUPS = ('project', 'designation')
+PERCENTILES = (50, 90)
+
+# Statistics of one project or designation over a date range. days
+# counts the days with manpower entered, average and the percentiles
+# are of the daily present manpower over these days.
+GroupStats = namedtuple('GroupStats', 'name present absent vacation days absence_rate '
+                                      'average median p90 peak')
+
+
+class Columns:
+    """Manpower of each day, project and designation, one array per
+    field, ordered by day. Days are date ordinals."""
+    def __init__(self, day, project, designation, present, absent, vacation):
+        self.day = day
+        self.project = project
+        self.designation = designation
+        self.present = present
+        self.absent = absent
+        self.vacation = vacation
+
+    def __len__(self):
+        return len(self.day)
+
+    def between(self, date_from=None, date_to=None):
+        """Return the rows of the days between the two dates, both
+        included. The arrays are views, nothing is copied."""
+        start = 0 if date_from is None else np.searchsorted(self.day, date_from.toordinal(), 'left')
+        stop = len(self) if date_to is None else np.searchsorted(self.day, date_to.toordinal(), 'right')
+        return Columns(*(values[start:stop] for values in self.arrays()))
+
+    def where(self, mask):
+        return Columns(*(values[mask] for values in self.arrays()))
+
+    def arrays(self):
+        return (self.day, self.project, self.designation, self.present, self.absent, self.vacation)
+
+
+def load_columns(session):
+    """Read the whole rollup into a Columns."""
+    records = session.execute(select(DailyRollup.tr_date, DailyRollup.project_id,
+                                     DailyRollup.designation_id, DailyRollup.present,
+                                     DailyRollup.absent, DailyRollup.vacation)
+                              .order_by(DailyRollup.tr_date)).all()
+    day = np.fromiter((record[0].toordinal() for record in records), dtype=np.int32, count=len(records))
+    values = np.array([record[1:] for record in records], dtype=np.int32).reshape(-1, 5)
+    return Columns(day, *(values[:, column] for column in range(5)))
+
+
+def snapshot_columns(url):
+    """Return the Columns of the last snapshot of the database at url,
+    or None, without running any query. They may miss the latest
+    changes."""
+    arrays = snapshot.open_arrays(url)
+    return Columns(*arrays) if arrays is not None else None
+
+
+def columns(session):
+    """Return the cached Columns, loading them on first use or after
+    manpower was changed."""
+    key = ('analytics',)
+    data = AGGREGATES.get(key)
+    if data is not None:
+        return data
+    generation = AGGREGATES.generation
+    try:
+        data = Columns(*snapshot.update(session))
+    except OSError:
+        # The snapshot folder can not be written, read everything.
+        data = load_columns(session)
+    # Any change of manpower invalidates the arrays.
+    return AGGREGATES.put(key, datetime.min, datetime.max, data, generation)
+
+
+def _group_ids(data, by):
+    if by not in GROUPS:
+        raise ValueError(f'can not group by {by}')
+    return data.project if by == 'project' else data.designation
+
+
+def group_totals(data, by='project'):
+    """Return the ids found and the (present, absent, vacation) sums of
+    each, as int64 arrays."""
+    keys, inverse = np.unique(_group_ids(data, by), return_inverse=True)
+    sums = [np.bincount(inverse, weights=getattr(data, field), minlength=len(keys)).astype(np.int64)
+            for field in FIELDS]
+    return keys, sums
+
+
+def daily_totals(data, by='project'):
+    """Return the ids, the days and a (ids x days) matrix of the daily
+    present manpower of each id, zero where nothing was entered, and a
+    matching matrix of booleans telling the days entered."""
+    if len(data) == 0:
+        return np.empty(0, np.int32), np.empty(0, np.int32), np.zeros((0, 0), np.int64), np.zeros((0, 0), bool)
+    keys, inverse = np.unique(_group_ids(data, by), return_inverse=True)
+    first = int(data.day[0])
+    days = np.arange(first, int(data.day[-1]) + 1, dtype=np.int32)
+    cell = inverse * len(days) + (data.day - first)
+    size = len(keys) * len(days)
+    present = np.bincount(cell, weights=data.present, minlength=size).astype(np.int64)
+    entered = np.bincount(cell, minlength=size) > 0
+    return keys, days, present.reshape(len(keys), len(days)), entered.reshape(len(keys), len(days))
+
+
+def rolling_average(values, window):
+    """Return the average of the last window values at each position of
+    values. The first positions average the values seen so far."""
+    values = np.asarray(values, dtype=np.float64)
+    total = np.concatenate(([0.0], np.cumsum(values, axis=-1)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (total[ends] - total[starts]) / (ends - starts)
+
+
+def absence_rates(data, by='project'):
+    """Return the ids and the share of absent in all manpower of each."""
+    keys, (present, absent, vacation) = group_totals(data, by)
+    total = present + absent + vacation
+    rates = np.divide(absent, total, out=np.zeros(len(keys)), where=total != 0)
+    return keys, rates
+
+
+def percentiles(groups, values, q=PERCENTILES):
+    """Return the unique groups and, for each percentile in q, an array
+    of the percentile of the values of each group, interpolated like
+    numpy.percentile. All groups are handled in one sort."""
+    order = np.lexsort((values, groups))
+    groups = np.asarray(groups)[order]
+    values = np.asarray(values, dtype=np.float64)[order]
+    keys, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    result = []
+    for percent in q:
+        position = starts + (counts - 1) * (percent / 100)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        result.append(values[low] + (values[high] - values[low]) * (position - low))
+    return keys, result
+
+
+def group_stats(session, date_from=None, date_to=None, by='project'):
+    """Return a GroupStats of each project or designation with manpower
+    between the two dates, both included, ordered by id."""
+    data = columns(session).between(date_from, date_to)
+    keys, (present, absent, vacation) = group_totals(data, by)
+    if len(keys) == 0:
+        return []
+    # Every helper groups by the same sorted ids, so their rows match.
+    _, rates = absence_rates(data, by)
+    _, _, daily, entered = daily_totals(data, by)
+    # Only the days with manpower entered count for the averages.
+    rows, cols = np.nonzero(entered)
+    daily_values = daily[rows, cols]
+    _, (median, p90, peak) = percentiles(rows, daily_values, (50, 90, 100))
+    days_entered = entered.sum(axis=1)
+    averages = daily.sum(axis=1) / days_entered
+
+    cache = PROJECTS if by == 'project' else DESIGNATIONS
+    names = dict(cache.items(session))
+    return [GroupStats(names.get(int(key), str(key)), int(present[index]), int(absent[index]),
+                       int(vacation[index]), int(days_entered[index]), round(float(rates[index]), 4),
+                       round(float(averages[index]), 1), float(median[index]), float(p90[index]),
+                       int(peak[index]))
+            for index, key in enumerate(keys)]
@@ -0,0 +1,4 @@
+"""Benchmarks of the headless database and report paths.
+
+See benchmarks/run.py, they are run with python -m benchmarks.run.
+"""
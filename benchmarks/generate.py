@@ -0,0 +1,74 @@
+"""Fill an SQLite database with made up but realistic manpower data.
+
+Every project gets one transaction per day and a line for a random part
+of the designations, the same random seed always gives the same data.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from dtbase.dtbase import Project, Designation, Transaction, TransactionDetails
+from dtbase.connection import make_engine
+from dtbase.migrate import upgrade
+from dtbase import rollup
+
+REMARKS = ('', '', '', '', 'Rain in the afternoon', 'Concrete pouring', 'Site inspection',
+           'Holiday', 'Safety training', 'Material delay')
+
+# Rows inserted per executemany.
+BATCH_SIZE = 20000
+
+
+def create_database(filename):
+    """Create an empty database with the schema and settings of the
+    application and return (engine, sessionmaker)."""
+    engine = make_engine(f'sqlite:///{filename}')
+    upgrade(engine)
+    return engine, sessionmaker(bind=engine)
+
+
+def generate(engine, projects=10, designations=20, years=1, fill=0.6, seed=1,
+             first_day=datetime(2015, 1, 1)):
+    """Insert the data and return the number of rows of each table."""
+    rnd = random.Random(seed)
+    days = int(years * 365)
+    counts = {'project': projects, 'designation': designations, 'transaction': 0, 'transactiondetails': 0}
+    with engine.begin() as conn:
+        conn.execute(Project.__table__.insert(),
+                     [{'id': i, 'name': f'Project {i:03d}'} for i in range(1, projects+1)])
+        conn.execute(Designation.__table__.insert(),
+                     [{'id': i, 'name': f'Designation {i:03d}'} for i in range(1, designations+1)])
+
+        trans_id = 0
+        detail_id = 0
+        trans_rows = []
+        detail_rows = []
+        for day in range(days):
+            tr_date = first_day + timedelta(days=day)
+            for project_id in range(1, projects+1):
+                trans_id += 1
+                trans_rows.append({'id': trans_id, 'tr_date': tr_date, 'project_id': project_id,
+                                   'remarks': rnd.choice(REMARKS)})
+                for designation_id in range(1, designations+1):
+                    if rnd.random() >= fill:
+                        continue
+                    detail_id += 1
+                    detail_rows.append({'id': detail_id, 'transaction_id': trans_id,
+                                        'designation_id': designation_id,
+                                        'present': rnd.randint(0, 30), 'absent': rnd.randint(0, 3),
+                                        'vacation': rnd.randint(0, 2)})
+            if len(detail_rows) >= BATCH_SIZE:
+                conn.execute(Transaction.__table__.insert(), trans_rows)
+                conn.execute(TransactionDetails.__table__.insert(), detail_rows)
+                trans_rows = []
+                detail_rows = []
+        if len(trans_rows) != 0:
+            conn.execute(Transaction.__table__.insert(), trans_rows)
+        if len(detail_rows) != 0:
+            conn.execute(TransactionDetails.__table__.insert(), detail_rows)
+        counts['transaction'] = trans_id
+        counts['transactiondetails'] = detail_id
+        counts['dailyrollup'] = rollup.rebuild(conn)
+    return counts
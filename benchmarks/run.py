@@ -0,0 +1,202 @@
+"""Time the headless paths of the application on generated databases.
+
+    python -m benchmarks.run --sizes small,medium --output results.json
+    python -m benchmarks.run --sizes small --compare results.json
+
+Each size gets a fresh database in a temporary folder. Every benchmark
+is run several times and the fastest and median times are kept, the
+results are written as JSON so two runs can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import sqlalchemy
+
+from dtbase.dtbase import Designation
+from dtbase.summary import daily_summary, project_details, range_report
+from dtbase.history import history_page, page_key
+from dtbase.search import search_transactions
+from dtbase.lookup import search_names, PROJECTS, DESIGNATIONS
+from dtbase.dashboard import dashboard_data
+from dtbase.cache import AGGREGATES, DAYS
+from benchmarks.generate import create_database, generate
+import snapshot
+
+# (projects, designations, years) of each data size.
+SIZES = {
+    'small': (5, 10, 1),
+    'medium': (20, 40, 2),
+    'large': (40, 60, 5),
+}
+FIRST_DAY = datetime(2015, 1, 1)
+
+
+def full_history(session):
+    """Read the whole history page by page like the transaction window."""
+    count = 0
+    after = None
+    while True:
+        rows = history_page(session, after, 1000)
+        count += len(rows)
+        if len(rows) < 1000:
+            return count
+        after = page_key(rows[-1])
+
+
+def cold_summary(session, tr_date):
+    DAYS.clear()
+    return daily_summary(session, tr_date)
+
+
+def cold_details(session, tr_date, project_name):
+    DAYS.clear()
+    return project_details(session, tr_date, project_name)
+
+
+def cold_dashboard(session, date_to):
+    AGGREGATES.clear()
+    return dashboard_data(session, date_to)
+
+
+def cold_analytics(session):
+    from analytics import group_stats
+    AGGREGATES.clear()
+    return group_stats(session)
+
+
+def warm_analytics(session):
+    from analytics import group_stats
+    return group_stats(session, by='designation')
+
+
+def export_month_xlsx(session, folder, date_from):
+    from reports import export_range
+    export_range(session, os.path.join(folder, 'month.xlsx'), date_from, date_from + timedelta(days=30))
+
+
+def export_day_pdf(session, folder, tr_date):
+    from reports import write_summary_pdf
+    write_summary_pdf(os.path.join(folder, 'day.pdf'), f'{tr_date:%d/%m/%Y}', cold_summary(session, tr_date))
+
+
+def benchmarks(folder, days):
+    """Return (name, function(session)) of every benchmark."""
+    last_day = FIRST_DAY + timedelta(days=days-1)
+    middle = FIRST_DAY + timedelta(days=days//2)
+    month = middle.replace(day=1)
+    return [
+        ('daily_summary', lambda session: cold_summary(session, middle)),
+        ('project_details', lambda session: cold_details(session, middle, 'Project 001')),
+        ('daily_summary_cached', lambda session: daily_summary(session, middle)),
+        ('full_history', full_history),
+        ('range_report_month', lambda session: range_report(session, month, month + timedelta(days=30))),
+        ('range_report_year', lambda session: range_report(session, last_day - timedelta(days=364), last_day)),
+        ('dashboard', lambda session: cold_dashboard(session, last_day)),
+        ('analytics_cold', cold_analytics),
+        ('analytics_warm', warm_analytics),
+        ('export_month_xlsx', lambda session: export_month_xlsx(session, folder, month)),
+        ('export_day_pdf', lambda session: export_day_pdf(session, folder, middle)),
+        ('search_transactions', lambda session: search_transactions(session, 'rain')),
+        ('search_names', lambda session: search_names(session, Designation, 'designation 01')),
+    ]
+
+
+def time_call(func, session, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(session)
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+def run_size(name, repeat, only=None):
+    projects, designations, years = SIZES[name]
+    with tempfile.TemporaryDirectory() as folder:
+        engine, Session = create_database(os.path.join(folder, 'bench.db'))
+        start = time.perf_counter()
+        counts = generate(engine, projects, designations, years, first_day=FIRST_DAY)
+        generate_seconds = time.perf_counter() - start
+        # The name caches belong to the process, not to a database.
+        PROJECTS.invalidate()
+        DESIGNATIONS.invalidate()
+        # Keep the analytics snapshot away from the one of the user.
+        snapshot.SNAPSHOT_DIR = os.path.join(folder, 'snapshot')
+
+        timings = {}
+        for bench, func in benchmarks(folder, int(years * 365)):
+            if only and bench not in only:
+                continue
+            session = Session()
+            try:
+                timings[bench] = time_call(func, session, repeat)
+            finally:
+                session.close()
+            print(f'{name:>8} {bench:<22} {timings[bench]["min"]*1000:10.1f} ms', file=sys.stderr)
+        engine.dispose()
+    return {'projects': projects, 'designations': designations, 'years': years,
+            'rows': counts, 'generate_seconds': generate_seconds, 'timings': timings}
+
+
+def compare(results, baseline):
+    """Print the change of the fastest time of each benchmark."""
+    print(f'{"size":>8} {"benchmark":<22} {"before ms":>10} {"after ms":>10} {"change":>8}')
+    for size, result in results['sizes'].items():
+        old = baseline['sizes'].get(size, {}).get('timings', {})
+        for bench, timing in result['timings'].items():
+            if bench not in old:
+                continue
+            before = old[bench]['min']
+            after = timing['min']
+            change = (after - before) / before * 100 if before else 0
+            print(f'{size:>8} {bench:<22} {before*1000:10.1f} {after*1000:10.1f} {change:+7.1f}%')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run',
+                                     description='Time the database and report paths on generated data.')
+    parser.add_argument('--sizes', default='small,medium',
+                        help=f'comma separated data sizes among {", ".join(SIZES)} (default: small,medium)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each benchmark (default: 5)')
+    parser.add_argument('--only', help='comma separated names of the benchmarks to run')
+    parser.add_argument('--output', help='file where the JSON results are written')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    for size in sizes:
+        if size not in SIZES:
+            parser.error(f'unknown size {size}')
+    only = set(args.only.split(',')) if args.only else None
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'platform': platform.platform(),
+        'sizes': {},
+    }
+    for size in sizes:
+        results['sizes'][size] = run_size(size, args.repeat, only)
+
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+    if args.compare:
+        with open(args.compare) as json_file:
+            compare(results, json.load(json_file))
+    elif not args.output:
+        json.dump(results, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Runs database work off the Tk event loop.
+
+Tk widgets may only be touched from the thread running mainloop(), so
+jobs run on a small thread pool and their results are put on a queue.
+The queue is polled with after() and callbacks run back on the Tk
+thread, where they can safely update the widgets.
+"""
+
+import itertools
+import queue
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from dtbase.connection import session_scope
+from dtbase import instrument
+
+
+class DBExecutor:
+    def __init__(self, widget, max_workers=2, poll_ms=30):
+        # Polling is scheduled on the root window so it keeps working
+        # when the window that submitted a job is closed.
+        self.root = widget.nametowidget('.')
+        self.poll_ms = poll_ms
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='manpower-db')
+        self.results = queue.Queue()
+        self.tickets = itertools.count(1)
+        # Latest ticket of each key, older tickets of the key are stale.
+        self.latest = {}
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.polling = False
+
+    def submit(self, func, *args, callback=None, errback=None, key=None, owner=None):
+        """Run func(session, *args) on a worker thread.
+
+        The session is created for the job, committed if it succeeds and
+        closed when it finishes. callback(result) or errback(error) is
+        then called on the Tk thread. Submitting a new job with the same
+        key makes the older ones stale: they are skipped if not started
+        yet and their result is dropped otherwise. Results for an owner
+        widget that has been destroyed in the meantime are dropped too.
+        """
+        ticket = next(self.tickets)
+        if key is not None:
+            with self.lock:
+                self.latest[key] = ticket
+        # The queries of the job count towards the user action that
+        # submitted it when profiling.
+        name = func.__name__
+        if instrument.current_action() is not None:
+            name = f'{instrument.current_action()} > {name}'
+        self.pending += 1
+        self.pool.submit(self._run, ticket, key, func, args, callback, errback, owner, name)
+        self._schedule()
+        return ticket
+
+    def cancel(self, key):
+        """Make every job submitted with key stale."""
+        with self.lock:
+            self.latest[key] = next(self.tickets)
+
+    def is_stale(self, ticket, key):
+        if key is None:
+            return False
+        with self.lock:
+            return self.latest.get(key) != ticket
+
+    def _run(self, ticket, key, func, args, callback, errback, owner, name):
+        result = error = None
+        if not self.is_stale(ticket, key):
+            try:
+                with instrument.action(name), session_scope() as session:
+                    result = func(session, *args)
+            except Exception as exc:
+                error = exc
+                error.traceback = traceback.format_exc()
+        self.results.put((ticket, key, result, error, callback, errback, owner))
+
+    def _schedule(self):
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self.polling = False
+        while True:
+            try:
+                ticket, key, result, error, callback, errback, owner = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if self.is_stale(ticket, key):
+                continue
+            if owner is not None and not owner.winfo_exists():
+                continue
+            if error is not None:
+                if errback is not None:
+                    errback(error)
+                else:
+                    print(error.traceback, file=sys.stderr)
+            elif callback is not None:
+                callback(result)
+        if self.pending > 0:
+            self._schedule()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+
+def get_executor(widget):
+    """Return the executor shared by all windows of the application."""
+    global _executor
+    if _executor is None:
+        _executor = DBExecutor(widget)
+    return _executor
@@ -0,0 +1,30 @@
+from .dtbase import Transaction, TransactionDetails
+from . import rollup
+
+
+def insert_details(session, trans_id, rows):
+    """Add many designation lines to a transaction at once.
+
+    rows is a list of (designation_id, present, absent, vacation). Lines
+    with nothing to count are skipped. All lines go in one executemany
+    insert and the rollup is updated in the same session, so the caller
+    commits everything at once. Returns the number of lines inserted.
+    """
+    rows = [row for row in rows if row[1] != 0 or row[2] != 0 or row[3] != 0]
+    if len(rows) == 0:
+        return 0
+    tr_date, project_id = session.query(Transaction.tr_date, Transaction.project_id)\
+        .filter(Transaction.id == trans_id)\
+        .one()
+
+    params = [{'transaction_id': trans_id, 'designation_id': designation_id,
+               'present': present, 'absent': absent, 'vacation': vacation}
+              for designation_id, present, absent, vacation in rows]
+    session.execute(TransactionDetails.__table__.insert(), params)
+
+    deltas = {}
+    for designation_id, present, absent, vacation in rows:
+        total = deltas.get(designation_id, (0, 0, 0))
+        deltas[designation_id] = (total[0] + present, total[1] + absent, total[2] + vacation)
+    rollup.apply_deltas(session, tr_date, project_id, deltas)
+    return len(rows)
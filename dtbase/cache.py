@@ -0,0 +1,106 @@
+"""Cache of aggregate query results, dropped when the data behind them
+changes.
+
+Each entry remembers the dates it was computed from. The rollup helpers
+record the dates a session changes in session.info and once the session
+commits, the entries covering those dates are dropped. Entries also
+expire after a while so changes made by other users of a shared
+database are picked up.
+
+AGGREGATES holds the results over date ranges, DAYS the summary and
+details of single dates. DAYS is bounded and drops the least recently
+used entries first.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Seconds an entry is kept when nothing invalidates it.
+MAX_AGE = 300
+# Dates whose summary or details are kept, a few months of browsing.
+DAY_ENTRIES = 500
+
+
+class AggregateCache:
+    def __init__(self, max_age=MAX_AGE, max_entries=None):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # key -> (date_from, date_to, time stored, value), least recently
+        # used first.
+        self.entries = OrderedDict()
+        # Bumped by every invalidation, see put().
+        self.generation = 0
+
+    def get(self, key):
+        """Return the value stored under key, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] > self.max_age:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[3]
+
+    def put(self, key, date_from, date_to, value, generation=None):
+        """Store value, computed from the days date_from to date_to.
+
+        generation is the one read before running the query. When data
+        was invalidated while the query ran the value may be outdated
+        already and it is not stored. value is returned in any case.
+        """
+        with self.lock:
+            if generation is None or generation == self.generation:
+                self.entries[key] = (date_from, date_to, time.monotonic(), value)
+                self.entries.move_to_end(key)
+                if self.max_entries is not None and len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, date_from, date_to=None):
+        """Drop the entries using any day between the two dates. Without
+        dates everything is dropped."""
+        with self.lock:
+            self.generation += 1
+            if date_from is None and date_to is None:
+                self.entries.clear()
+                return
+            for key, entry in list(self.entries.items()):
+                if (date_to is None or entry[0] <= date_to) and (date_from is None or entry[1] >= date_from):
+                    del self.entries[key]
+
+    def clear(self):
+        self.invalidate(None, None)
+
+
+AGGREGATES = AggregateCache()
+DAYS = AggregateCache(max_entries=DAY_ENTRIES)
+CACHES = (AGGREGATES, DAYS)
+
+
+def mark_changed(session, date_from, date_to):
+    """Record that the session changed the manpower of a date range.
+
+    A missing date leaves that end of the range open. The cache is
+    invalidated when the session commits, so a query running at the same
+    time can not store the data from before the change.
+    """
+    session.info.setdefault('changed_dates', []).append((date_from, date_to))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    for date_from, date_to in session.info.pop('changed_dates', ()):
+        for cache in CACHES:
+            cache.invalidate(date_from, date_to)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back(session):
+    session.info.pop('changed_dates', None)
@@ -0,0 +1,65 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import func
+
+from .dtbase import Project, Designation, DailyRollup
+from .cache import AGGREGATES
+
+# Days covered by the project and ratio figures, and by the trends.
+RATIO_DAYS = 30
+TREND_DAYS = 90
+
+# projects is a list of ProjectShare over the last RATIO_DAYS and totals
+# their (present, absent, vacation) sums. dates lists the last TREND_DAYS
+# days and trends maps each designation to its present manpower of each
+# of these days, so the charts only have to scale the numbers.
+Dashboard = namedtuple('Dashboard', 'date_to projects totals dates trends')
+ProjectShare = namedtuple('ProjectShare', 'project present absent vacation')
+
+
+def dashboard_data(session, date_to):
+    """Return the dashboard figures of the days up to date_to.
+
+    The result is kept in the aggregate cache until manpower of one of
+    these days is changed, so opening the dashboard again does not read
+    the history again.
+    """
+    key = ('dashboard', date_to)
+    data = AGGREGATES.get(key)
+    if data is not None:
+        return data
+    generation = AGGREGATES.generation
+    ratio_from = date_to - timedelta(days=RATIO_DAYS-1)
+    trend_from = date_to - timedelta(days=TREND_DAYS-1)
+
+    records = session.query(Project.name,
+                            func.sum(DailyRollup.present),
+                            func.sum(DailyRollup.absent),
+                            func.sum(DailyRollup.vacation))\
+        .join(Project, DailyRollup.project_id == Project.id)\
+        .filter(DailyRollup.tr_date >= ratio_from)\
+        .filter(DailyRollup.tr_date <= date_to)\
+        .group_by(Project.id, Project.name)\
+        .order_by(Project.id)\
+        .all()
+    projects = [ProjectShare(*record) for record in records]
+    totals = (sum(share.present for share in projects),
+              sum(share.absent for share in projects),
+              sum(share.vacation for share in projects))
+
+    dates = [trend_from + timedelta(days=day) for day in range(TREND_DAYS)]
+    records = session.query(DailyRollup.tr_date, Designation.name,
+                            func.sum(DailyRollup.present))\
+        .join(Designation, DailyRollup.designation_id == Designation.id)\
+        .filter(DailyRollup.tr_date >= trend_from)\
+        .filter(DailyRollup.tr_date <= date_to)\
+        .group_by(DailyRollup.tr_date, Designation.id, Designation.name)\
+        .all()
+    trends = {}
+    for tr_date, designation, present in records:
+        day = (tr_date - trend_from).days
+        trends.setdefault(designation, [0] * TREND_DAYS)[day] = present
+
+    data = Dashboard(date_to, projects, totals, dates, trends)
+    return AGGREGATES.put(key, trend_from, date_to, data, generation)
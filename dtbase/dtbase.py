@@ -1,4 +1,4 @@
-from sqlalchemy import Column,Integer,ForeignKey,DateTime,String
+from sqlalchemy import Column,Integer,ForeignKey,DateTime,String,Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -6,16 +6,19 @@ Base = declarative_base()
 
 class Project(Base):
 	__tablename__ = 'project'
+	__table_args__ = (Index('ix_project_name', 'name', unique=True),)
 	id = Column(Integer, primary_key=True)
 	name = Column(String(350), nullable=False)
 
 class Designation(Base):
 	__tablename__ = 'designation'
+	__table_args__ = (Index('ix_designation_name', 'name', unique=True),)
 	id = Column(Integer, primary_key=True)
 	name = Column(String(350), nullable=False)
 
 class Transaction(Base):
 	__tablename__ = 'transaction'
+	__table_args__ = (Index('ix_transaction_date_project', 'tr_date', 'project_id'),)
 	id = Column(Integer, primary_key=True)
 	tr_date = Column(DateTime)
 	project_id = Column(Integer, ForeignKey('project.id'))
@@ -24,6 +27,7 @@ class Transaction(Base):
 	
 class TransactionDetails(Base):
 	__tablename__ = 'transactiondetails'
+	__table_args__ = (Index('ix_transactiondetails_trans_desg', 'transaction_id', 'designation_id'),)
 	id = Column(Integer, primary_key=True)
 	transaction_id = Column(Integer, ForeignKey('transaction.id'))
 	transaction = relationship(Transaction)
@@ -32,3 +36,12 @@ class TransactionDetails(Base):
 	present = Column(Integer)
 	absent = Column(Integer)
 	vacation = Column(Integer)
+
+class DailyRollup(Base):
+	__tablename__ = 'dailyrollup'
+	tr_date = Column(DateTime, primary_key=True)
+	project_id = Column(Integer, ForeignKey('project.id'), primary_key=True)
+	designation_id = Column(Integer, ForeignKey('designation.id'), primary_key=True)
+	present = Column(Integer, nullable=False, default=0)
+	absent = Column(Integer, nullable=False, default=0)
+	vacation = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,70 @@
+from collections import namedtuple
+
+from sqlalchemy import or_, and_
+
+from .dtbase import Project, Designation, Transaction, TransactionDetails
+
+# One detail line of the transaction history with its date and project.
+HistoryRow = namedtuple('HistoryRow', 'id tr_date project present absent vacation remarks')
+
+
+def history_page(session, after=None, limit=200, date_from=None, date_to=None):
+    """Return the next page of the transaction history.
+
+    Rows are ordered by (tr_date, detail id) and after is the key of the
+    last row of the previous page, so each page is a single indexed
+    range scan no matter how deep the user scrolls. The project name and
+    remarks come from the same joined query instead of lazy loads.
+    """
+    query = session.query(TransactionDetails.id, Transaction.tr_date, Project.name,
+                          TransactionDetails.present, TransactionDetails.absent,
+                          TransactionDetails.vacation, Transaction.remarks)\
+        .join(Transaction, TransactionDetails.transaction_id == Transaction.id)\
+        .outerjoin(Project, Transaction.project_id == Project.id)
+    if date_from is not None:
+        query = query.filter(Transaction.tr_date >= date_from)
+    if date_to is not None:
+        query = query.filter(Transaction.tr_date <= date_to)
+    if after is not None:
+        last_date, last_id = after
+        # The plain >= lets the database seek the date index, the OR
+        # alone makes it scan from the first date on every page.
+        query = query.filter(Transaction.tr_date >= last_date)\
+            .filter(or_(Transaction.tr_date > last_date,
+                        and_(Transaction.tr_date == last_date,
+                             TransactionDetails.id > last_id)))
+    records = query.order_by(Transaction.tr_date, TransactionDetails.id).limit(limit).all()
+    return [HistoryRow(*record) for record in records]
+
+
+def page_key(row):
+    """Return the key to pass as after to fetch the rows following row."""
+    return (row.tr_date, row.id)
+
+
+# One detail line of an export, ordered by date, project and designation.
+DetailRow = namedtuple('DetailRow', 'tr_date project designation present absent vacation remarks')
+
+
+def iter_details(session, date_from=None, date_to=None, batch=1000):
+    """Yield every detail row of the date range without loading them all.
+
+    The rows are streamed from the database in batches, so memory stays
+    flat however long the range is.
+    """
+    query = session.query(Transaction.tr_date, Project.name, Designation.name,
+                          TransactionDetails.present, TransactionDetails.absent,
+                          TransactionDetails.vacation, Transaction.remarks)\
+        .select_from(TransactionDetails)\
+        .join(Transaction, TransactionDetails.transaction_id == Transaction.id)\
+        .outerjoin(Project, Transaction.project_id == Project.id)\
+        .outerjoin(Designation, TransactionDetails.designation_id == Designation.id)
+    if date_from is not None:
+        query = query.filter(Transaction.tr_date >= date_from)
+    if date_to is not None:
+        query = query.filter(Transaction.tr_date <= date_to)
+    query = query.order_by(Transaction.tr_date, Project.name, Designation.name)\
+        .execution_options(stream_results=True)\
+        .yield_per(batch)
+    for record in query:
+        yield DetailRow(*record)
@@ -0,0 +1,147 @@
+"""Opt-in profiling of the database work done for each user action.
+
+Once enable() is called, every statement run by the engine is timed and
+counted against the action running on that thread, see action(). When
+an action ends one line is written to the log file with its number of
+queries, the time spent in the database and the wall time. Statements
+slower than SLOW_SECONDS are logged with their parameters, and the same
+statement run many times by one action is flagged as a likely N+1 query
+pattern.
+"""
+
+import functools
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# Statements taking longer than this are logged with their parameters.
+SLOW_SECONDS = 0.1
+# An action running the same statement more often is flagged as N+1.
+REPEAT_LIMIT = 10
+# Number of finished actions kept for the debug window.
+HISTORY_SIZE = 500
+
+logger = logging.getLogger('manpower.sql')
+_local = threading.local()
+_lock = threading.Lock()
+_enabled = False
+# Finished actions, newest last.
+history = deque(maxlen=HISTORY_SIZE)
+
+
+class ActionStats:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.statements = Counter()
+        self.repeated = []
+
+    def add(self, statement, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements[statement] += 1
+
+    def finish(self, wall_seconds):
+        self.wall_seconds = wall_seconds
+        self.repeated = [(statement, count) for statement, count in self.statements.items()
+                         if count > REPEAT_LIMIT]
+        # The texts are only needed to find the repeats.
+        self.statements = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(engine, log_file=None):
+    """Start timing the statements of engine, writing to log_file."""
+    global _enabled
+    if _enabled:
+        return
+    if log_file is not None:
+        handler = logging.FileHandler(log_file, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    event.listen(engine, 'before_cursor_execute', _before_execute)
+    event.listen(engine, 'after_cursor_execute', _after_execute)
+    _enabled = True
+
+
+@contextmanager
+def action(name):
+    """Count the statements run by the block on this thread as one
+    action. Nested actions count towards the outer one. Costs nothing
+    while instrumentation is off."""
+    if not _enabled or getattr(_local, 'action', None) is not None:
+        yield
+        return
+    stats = _local.action = ActionStats(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _local.action = None
+        stats.finish(time.perf_counter() - start)
+        # Actions that only handed work to another thread are not kept.
+        if stats.queries != 0:
+            _record(stats)
+
+
+def _record(stats):
+    with _lock:
+        history.append(stats)
+    logger.info('%s: %d queries, %.1f ms in database, %.1f ms wall', stats.name, stats.queries,
+                stats.db_seconds * 1000, stats.wall_seconds * 1000)
+    for statement, count in stats.repeated:
+        logger.warning('%s: possible N+1, ran %d times: %s', stats.name, count, _short(statement))
+
+
+def traced(func):
+    """Decorator running each call of func as an action named after it."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with action(func.__qualname__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def current_action():
+    """Return the name of the action running on this thread, or None."""
+    stats = getattr(_local, 'action', None)
+    return stats.name if stats is not None else None
+
+
+def recent_actions():
+    """Return a copy of the finished actions, newest first."""
+    with _lock:
+        return list(reversed(history))
+
+
+def _short(statement, length=300):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= length else statement[:length] + '...'
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['query_start'].pop()
+    stats = getattr(_local, 'action', None)
+    if stats is not None:
+        stats.add(statement, seconds)
+    if seconds > SLOW_SECONDS:
+        params = repr(parameters)
+        if len(params) > 300:
+            params = params[:300] + '...'
+        logger.warning('slow statement, %.1f ms in %s: %s %s', seconds * 1000,
+                       stats.name if stats is not None else 'no action', _short(statement), params)
@@ -0,0 +1,103 @@
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .dtbase import Project, Designation
+from .cache import CACHES
+from .search import name_filter
+
+
+def list_names(session, model):
+    """Return (id, name) of every record of a Project-like model."""
+    return session.query(model.id, model.name).order_by(model.id).all()
+
+
+def search_names(session, model, keyword):
+    """Return (id, name) of the records whose name contains keyword,
+    using the search index when there is one."""
+    return session.query(model.id, model.name)\
+        .filter(name_filter(session, model, keyword))\
+        .order_by(model.id)\
+        .all()
+
+
+class NameCache:
+    """Process-wide id <-> name maps of a Project-like model.
+
+    The table is read the first time a name or id is asked for and not
+    again until a session that added, renamed or deleted a record of the
+    model commits.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+        self.records = None
+        self.by_name = None
+        self.by_id = None
+
+    def _load(self, session):
+        """Return (records, by_name, by_id), read under the lock so that
+        an invalidate() on another thread can not clear them halfway."""
+        with self.lock:
+            if self.records is None:
+                self.records = list_names(session, self.model)
+                self.by_name = {name: id for id, name in self.records}
+                self.by_id = dict(self.records)
+            return self.records, self.by_name, self.by_id
+
+    def items(self, session):
+        """Return (id, name) of every record, ordered by id."""
+        records, by_name, by_id = self._load(session)
+        return list(records)
+
+    def names(self, session):
+        records, by_name, by_id = self._load(session)
+        return [name for id, name in records]
+
+    def ids(self, session):
+        """Return a {name: id} dictionary the caller may change."""
+        records, by_name, by_id = self._load(session)
+        return dict(by_name)
+
+    def id_of(self, session, name):
+        records, by_name, by_id = self._load(session)
+        return by_name.get(name)
+
+    def name_of(self, session, record_id):
+        records, by_name, by_id = self._load(session)
+        return by_id.get(record_id)
+
+    def invalidate(self):
+        with self.lock:
+            self.records = None
+            self.by_name = None
+            self.by_id = None
+
+
+PROJECTS = NameCache(Project)
+DESIGNATIONS = NameCache(Designation)
+_CACHES = {Project: PROJECTS, Designation: DESIGNATIONS}
+
+
+@event.listens_for(Session, 'before_flush')
+def _note_name_changes(session, flush_context, instances):
+    for record in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(record) in _CACHES:
+            session.info.setdefault('changed_names', set()).add(type(record))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_names(session):
+    changed = session.info.pop('changed_names', ())
+    for model in changed:
+        _CACHES[model].invalidate()
+    # The cached summaries and reports hold the names.
+    if changed:
+        for cache in CACHES:
+            cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_name_changes(session):
+    session.info.pop('changed_names', None)
@@ -0,0 +1,115 @@
+from sqlalchemy import MetaData, Table, Column, Integer, inspect, select, func
+
+from .dtbase import Base, Project, Designation, Transaction, TransactionDetails, DailyRollup
+from . import rollup
+from .search import create_search_index, drop_search_index
+
+# Holds the schema version of the database in a single row. It is kept
+# outside Base so the models never have to know about it.
+_version_meta = MetaData()
+schema_version = Table('schema_version', _version_meta,
+                       Column('version', Integer, nullable=False))
+
+
+def _merge_duplicate_names(conn, model, child_column):
+    """Point the children of duplicated names to the oldest record and
+    delete the duplicates, so that a unique index can be created."""
+    table = model.__table__
+    dupes = conn.execute(select(table.c.name, func.min(table.c.id))
+                         .group_by(table.c.name)
+                         .having(func.count() > 1)).all()
+    for name, keep_id in dupes:
+        dupe_ids = select(table.c.id).where(table.c.name == name, table.c.id != keep_id)
+        conn.execute(child_column.table.update()
+                     .where(child_column.in_(dupe_ids))
+                     .values({child_column.name: keep_id}))
+        conn.execute(table.delete().where(table.c.name == name, table.c.id != keep_id))
+
+
+def _add_indexes(conn):
+    """Version 1: indexes on the date/transaction lookups and unique
+    project and designation names."""
+    _merge_duplicate_names(conn, Project, Transaction.__table__.c.project_id)
+    _merge_duplicate_names(conn, Designation, TransactionDetails.__table__.c.designation_id)
+    for model in (Project, Designation, Transaction, TransactionDetails):
+        for index in model.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _add_daily_rollup(conn):
+    """Version 2: the per day/project/designation rollup table, filled
+    from the existing history."""
+    DailyRollup.__table__.create(conn, checkfirst=True)
+    rollup.rebuild(conn)
+
+
+def _add_search_index(conn):
+    """Version 3: the full-text search table and the triggers keeping it
+    up to date, on SQLite only."""
+    create_search_index(conn)
+
+
+def _trigram_search_index(conn):
+    """Version 4: the search table indexed by trigrams, so searches find
+    text in the middle of words too."""
+    drop_search_index(conn)
+    create_search_index(conn)
+
+
+# Ordered list of (version, upgrade function). New steps go at the end
+# and must never be renumbered once released.
+MIGRATIONS = [
+    (1, _add_indexes),
+    (2, _add_daily_rollup),
+    (3, _add_search_index),
+    (4, _trigram_search_index),
+]
+
+# Steps create_all() can not do, such as virtual tables and triggers.
+# New databases run them too.
+SETUP = [
+    _add_search_index,
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """Return the schema version stored in the database, 0 if none."""
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    version = conn.execute(select(schema_version.c.version)).scalar()
+    return version or 0
+
+
+def _set_version(conn, version):
+    conn.execute(schema_version.delete())
+    conn.execute(schema_version.insert().values(version=version))
+
+
+def upgrade(engine):
+    """Bring the database up to the latest schema version.
+
+    A new database gets all tables and indexes at once. An existing one
+    only runs the steps it has not seen yet, each in its own transaction
+    so that a failing step leaves the previous version untouched.
+    Returns the resulting schema version.
+    """
+    with engine.begin() as conn:
+        fresh = not inspect(conn).has_table(Project.__tablename__)
+        Base.metadata.create_all(conn)
+        schema_version.create(conn, checkfirst=True)
+        if fresh:
+            for setup in SETUP:
+                setup(conn)
+            _set_version(conn, SCHEMA_VERSION)
+            return SCHEMA_VERSION
+        version = current_version(conn)
+
+    for step, migration in MIGRATIONS:
+        if step > version:
+            with engine.begin() as conn:
+                migration(conn)
+                _set_version(conn, step)
+            version = step
+    return version
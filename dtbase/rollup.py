@@ -0,0 +1,107 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .dtbase import DailyRollup, Transaction, TransactionDetails
+from .cache import mark_changed
+
+AMOUNTS = ('present', 'absent', 'vacation')
+# Dialects with INSERT ... ON CONFLICT DO UPDATE.
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _add_rows(session, rows):
+    """Add the amounts of rows to the rollup in the database itself, so
+    that sessions changing the same key at the same time all count."""
+    table = DailyRollup.__table__
+    insert = UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if insert is not None:
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.tr_date, table.c.project_id, table.c.designation_id],
+            set_={name: table.c[name] + statement.excluded[name] for name in AMOUNTS})
+        session.execute(statement, rows)
+        return
+    for row in rows:
+        add = update(table)\
+            .where(table.c.tr_date == row['tr_date'])\
+            .where(table.c.project_id == row['project_id'])\
+            .where(table.c.designation_id == row['designation_id'])\
+            .values({name: table.c[name] + row[name] for name in AMOUNTS})
+        if session.execute(add).rowcount > 0:
+            continue
+        try:
+            with session.begin_nested():
+                session.execute(table.insert(), row)
+        except IntegrityError:
+            # Inserted by another session in the meantime.
+            session.execute(add)
+
+
+def apply_delta(session, tr_date, project_id, designation_id, present=0, absent=0, vacation=0):
+    """Add the given amounts to a rollup row, creating it when missing.
+
+    This must run in the same session as the detail change so that both
+    are committed, or rolled back, together. Rows that drop to zero are
+    removed to keep the table small.
+    """
+    apply_deltas(session, tr_date, project_id, {designation_id: (present, absent, vacation)})
+
+
+def apply_deltas(session, tr_date, project_id, deltas):
+    """Add the (present, absent, vacation) amounts of many designations
+    of one project and date to the rollup.
+
+    deltas maps designation id to the amounts. The amounts are added by
+    one statement, never read back and written, and the rows left at
+    zero are then deleted by another.
+    """
+    rows = [{'tr_date': tr_date, 'project_id': project_id, 'designation_id': designation_id,
+             'present': present, 'absent': absent, 'vacation': vacation}
+            for designation_id, (present, absent, vacation) in deltas.items()
+            if present != 0 or absent != 0 or vacation != 0]
+    if len(rows) == 0:
+        return
+    mark_changed(session, tr_date, tr_date)
+    _add_rows(session, rows)
+    table = DailyRollup.__table__
+    session.execute(table.delete()
+                    .where(table.c.tr_date == tr_date)
+                    .where(table.c.project_id == project_id)
+                    .where(table.c.designation_id.in_([row['designation_id'] for row in rows]))
+                    .where(table.c.present == 0)
+                    .where(table.c.absent == 0)
+                    .where(table.c.vacation == 0))
+
+
+def rebuild(bind, date_from=None, date_to=None):
+    """Recompute the rollup from the transaction details.
+
+    bind can be a session or a connection. Without dates the whole
+    history is rebuilt, otherwise only the days in the inclusive range.
+    Returns the number of rollup rows written.
+    """
+    table = DailyRollup.__table__
+    tr_table = Transaction.__table__
+    dt_table = TransactionDetails.__table__
+
+    delete = table.delete()
+    source = select(tr_table.c.tr_date, tr_table.c.project_id, dt_table.c.designation_id,
+                    func.sum(dt_table.c.present), func.sum(dt_table.c.absent),
+                    func.sum(dt_table.c.vacation))\
+        .select_from(dt_table.join(tr_table, dt_table.c.transaction_id == tr_table.c.id))\
+        .group_by(tr_table.c.tr_date, tr_table.c.project_id, dt_table.c.designation_id)
+    if date_from is not None:
+        delete = delete.where(table.c.tr_date >= date_from)
+        source = source.where(tr_table.c.tr_date >= date_from)
+    if date_to is not None:
+        delete = delete.where(table.c.tr_date <= date_to)
+        source = source.where(tr_table.c.tr_date <= date_to)
+
+    if isinstance(bind, Session):
+        mark_changed(bind, date_from, date_to)
+    bind.execute(delete)
+    result = bind.execute(table.insert().from_select(
+        ['tr_date', 'project_id', 'designation_id', 'present', 'absent', 'vacation'], source))
+    return result.rowcount
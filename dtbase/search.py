@@ -0,0 +1,142 @@
+"""Full-text search over project names, designation names and remarks.
+
+On SQLite the text is kept in an FTS5 table filled by triggers, so it
+never goes out of step with the tables whichever program writes to
+them. Each entry uses id * 4 + kind as its rowid, which lets the
+triggers find it without scanning. The table uses the trigram tokenizer,
+so a search finds the typed text anywhere in a name, in the middle of a
+word too, the same as LIKE '%text%' does. Other databases, an SQLite
+without FTS5 or older than 3.34, and searches shorter than three
+characters, which trigrams can not match, fall back to LIKE.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import func, inspect, or_, text
+
+from .dtbase import Project, Transaction, TransactionDetails
+
+SEARCH_TABLE = 'search_index'
+# Shortest text the trigram tokenizer can match.
+MIN_MATCH = 3
+KINDS = {'project': 1, 'designation': 2, 'transaction': 3}
+# Table and text column indexed for each kind, the table names are the
+# kind names.
+COLUMNS = {'project': 'name', 'designation': 'name', 'transaction': 'remarks'}
+
+
+def _statements():
+    yield f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(body, tokenize='trigram')"
+    for table, code in KINDS.items():
+        column = COLUMNS[table]
+        body = f"coalesce(new.{column}, '')"
+        yield (f'CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON "{table}" BEGIN '
+               f'INSERT INTO {SEARCH_TABLE}(rowid, body) VALUES (new.id * 4 + {code}, {body}); END')
+        yield (f'CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {column} ON "{table}" BEGIN '
+               f'UPDATE {SEARCH_TABLE} SET body = {body} WHERE rowid = new.id * 4 + {code}; END')
+        yield (f'CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON "{table}" BEGIN '
+               f'DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 4 + {code}; END')
+        yield (f'INSERT INTO {SEARCH_TABLE}(rowid, body) '
+               f'SELECT id * 4 + {code}, coalesce({column}, \'\') FROM "{table}"')
+
+
+def create_search_index(conn):
+    """Create the search table and its triggers and index the existing
+    records. Does nothing when the database can not hold it."""
+    if conn.dialect.name != 'sqlite' or inspect(conn).has_table(SEARCH_TABLE):
+        return
+    # Without FTS5 compiled in, or the trigram tokenizer of SQLite 3.34,
+    # the searches use LIKE.
+    if not conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+        return
+    version = conn.execute(text('SELECT sqlite_version()')).scalar()
+    if tuple(int(part) for part in version.split('.')[:2]) < (3, 34):
+        return
+    for statement in _statements():
+        conn.execute(text(statement))
+
+
+def drop_search_index(conn):
+    """Drop the search table and its triggers, if there are any."""
+    if conn.dialect.name != 'sqlite':
+        return
+    for table in KINDS:
+        for action in ('insert', 'update', 'delete'):
+            conn.execute(text(f'DROP TRIGGER IF EXISTS {table}_search_{action}'))
+    conn.execute(text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+
+
+# Engines already checked for the search table, see has_search_index().
+_available = {}
+
+
+def has_search_index(session):
+    engine = session.get_bind()
+    if engine not in _available:
+        _available[engine] = engine.dialect.name == 'sqlite' \
+            and inspect(engine).has_table(SEARCH_TABLE)
+    return _available[engine]
+
+
+def match_query(keyword):
+    """Turn what the user typed into an FTS5 query matching records that
+    contain it, like LIKE '%keyword%', or None if it is too short."""
+    keyword = keyword.strip()
+    if len(keyword) < MIN_MATCH:
+        return None
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def search_ids(kind, keyword):
+    """Return a query of the ids of one kind of record matching keyword."""
+    code = KINDS[kind]
+    return text(f'SELECT rowid / 4 AS id FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH :query AND rowid % 4 = {code}')\
+        .bindparams(query=match_query(keyword))\
+        .columns(id=Project.id.type)\
+        .subquery()
+
+
+def name_filter(session, model, keyword):
+    """Return the filter selecting the records of model whose name
+    matches keyword."""
+    if has_search_index(session) and match_query(keyword) is not None:
+        return model.id.in_(search_ids(model.__tablename__, keyword).select())
+    return model.name.ilike(f'%{keyword.strip()}%')
+
+
+# One transaction found by search_transactions, with its totals.
+TransactionHit = namedtuple('TransactionHit', 'id tr_date project present absent vacation remarks')
+
+
+def search_transactions(session, keyword, limit=200):
+    """Return the latest transactions whose project name or remarks
+    match keyword, newest first.
+
+    The matching transactions are picked and limited first and only
+    their details are summed.
+    """
+    if has_search_index(session) and match_query(keyword) is not None:
+        remarks = Transaction.id.in_(search_ids('transaction', keyword).select())
+    else:
+        remarks = Transaction.remarks.ilike(f'%{keyword.strip()}%')
+    hits = session.query(Transaction.id)\
+        .filter(or_(Transaction.project_id.in_(session.query(Project.id)
+                                               .filter(name_filter(session, Project, keyword))),
+                    remarks))\
+        .order_by(Transaction.tr_date.desc(), Transaction.id.desc())\
+        .limit(limit)\
+        .subquery()
+
+    records = session.query(Transaction.id, Transaction.tr_date, Project.name,
+                            func.coalesce(func.sum(TransactionDetails.present), 0),
+                            func.coalesce(func.sum(TransactionDetails.absent), 0),
+                            func.coalesce(func.sum(TransactionDetails.vacation), 0),
+                            Transaction.remarks)\
+        .join(hits, hits.c.id == Transaction.id)\
+        .outerjoin(Project, Transaction.project_id == Project.id)\
+        .outerjoin(TransactionDetails, TransactionDetails.transaction_id == Transaction.id)\
+        .group_by(Transaction.id, Transaction.tr_date, Project.name, Transaction.remarks)\
+        .order_by(Transaction.tr_date.desc(), Transaction.id.desc())\
+        .all()
+    return [TransactionHit(*record) for record in records]
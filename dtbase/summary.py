@@ -0,0 +1,242 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func
+
+from .dtbase import Project, Designation, Transaction, TransactionDetails, DailyRollup
+from .lookup import PROJECTS, DESIGNATIONS
+from .cache import DAYS
+
+# One line of the daily manpower summary.
+SummaryRow = namedtuple('SummaryRow', 'project present absent vacation remarks')
+
+
+def cached_summary(tr_date):
+    """Return the summary of tr_date if it is cached, or None."""
+    return DAYS.get(('summary', tr_date))
+
+
+def daily_summary(session, tr_date):
+    """Return the manpower summary of every project for the given date.
+
+    The totals are read from the daily rollup in a single grouped query.
+    The remarks of a project are taken from its latest transaction on
+    that date which has a non-empty remark. Projects with nothing
+    recorded and no remarks are left out, same as the old screens did.
+    The result is kept in the day cache until that date is changed.
+    """
+    rows = cached_summary(tr_date)
+    if rows is not None:
+        return rows
+    generation = DAYS.generation
+    latest_remarks = session.query(Transaction.remarks)\
+        .filter(Transaction.project_id == Project.id)\
+        .filter(Transaction.tr_date == tr_date)\
+        .filter(Transaction.remarks != '')\
+        .order_by(Transaction.id.desc())\
+        .limit(1)\
+        .correlate(Project)\
+        .scalar_subquery()
+
+    totals = session.query(DailyRollup.project_id,
+                           func.sum(DailyRollup.present).label('present'),
+                           func.sum(DailyRollup.absent).label('absent'),
+                           func.sum(DailyRollup.vacation).label('vacation'))\
+        .filter(DailyRollup.tr_date == tr_date)\
+        .group_by(DailyRollup.project_id)\
+        .subquery()
+    # Projects with a transaction that day, even one without details.
+    entered = session.query(Transaction.project_id)\
+        .filter(Transaction.tr_date == tr_date)
+
+    records = session.query(Project.name,
+                            func.coalesce(totals.c.present, 0),
+                            func.coalesce(totals.c.absent, 0),
+                            func.coalesce(totals.c.vacation, 0),
+                            latest_remarks)\
+        .outerjoin(totals, totals.c.project_id == Project.id)\
+        .filter(Project.id.in_(entered))\
+        .order_by(Project.id)\
+        .all()
+
+    rows = []
+    for name, present, absent, vacation, remarks in records:
+        remarks = remarks or ''
+        if (present + absent + vacation) != 0 or remarks != '':
+            rows.append(SummaryRow(name, present, absent, vacation, remarks))
+    return DAYS.put(('summary', tr_date), tr_date, tr_date, rows, generation)
+
+
+def summary_range(session, date_from, date_to):
+    """Compute the summary of every date between date_from and date_to,
+    both included, and keep them in the day cache, so that browsing
+    through these dates needs no query.
+
+    The totals of all the dates come from one grouped query on the
+    rollup and the projects entered, with their names and latest
+    remarks, from one query on the transactions. Returns {date: rows}, the rows being
+    the same as daily_summary() would return.
+    """
+    generation = DAYS.generation
+    totals = session.query(DailyRollup.tr_date, DailyRollup.project_id,
+                           func.sum(DailyRollup.present),
+                           func.sum(DailyRollup.absent),
+                           func.sum(DailyRollup.vacation))\
+        .filter(DailyRollup.tr_date >= date_from)\
+        .filter(DailyRollup.tr_date <= date_to)\
+        .group_by(DailyRollup.tr_date, DailyRollup.project_id)\
+        .all()
+    totals = {(tr_date, project_id): values for tr_date, project_id, *values in totals}
+
+    # Latest transaction with a remark of each project and date, None
+    # when the project was entered without any remark.
+    entered = session.query(Transaction.tr_date, Transaction.project_id,
+                            func.max(case((Transaction.remarks != '', Transaction.id))).label('remark_id'))\
+        .filter(Transaction.tr_date >= date_from)\
+        .filter(Transaction.tr_date <= date_to)\
+        .group_by(Transaction.tr_date, Transaction.project_id)\
+        .subquery()
+    records = session.query(entered.c.tr_date, entered.c.project_id, Project.name, Transaction.remarks)\
+        .join(Project, Project.id == entered.c.project_id)\
+        .outerjoin(Transaction, Transaction.id == entered.c.remark_id)\
+        .order_by(entered.c.tr_date, entered.c.project_id)\
+        .all()
+
+    summaries = {}
+    day = date_from
+    while day <= date_to:
+        summaries[day] = []
+        day += timedelta(days=1)
+    for tr_date, project_id, name, remarks in records:
+        present, absent, vacation = totals.get((tr_date, project_id), (0, 0, 0))
+        remarks = remarks or ''
+        if (present + absent + vacation) != 0 or remarks != '':
+            summaries.setdefault(tr_date, []).append(SummaryRow(name, present, absent, vacation, remarks))
+    for tr_date, rows in summaries.items():
+        DAYS.put(('summary', tr_date), tr_date, tr_date, rows, generation)
+    return summaries
+
+
+def summary_totals(rows):
+    """Return the (present, absent, vacation) grand totals of summary rows."""
+    sum_pre = sum(row.present for row in rows)
+    sum_abs = sum(row.absent for row in rows)
+    sum_vac = sum(row.vacation for row in rows)
+    return sum_pre, sum_abs, sum_vac
+
+
+# Entry status of one day, see month_status(). headcount is the present,
+# absent and vacation manpower of all projects.
+DayStatus = namedtuple('DayStatus', 'projects headcount')
+
+
+def month_status(session, year, month):
+    """Return {day of month: DayStatus} of the days of a month with at
+    least one transaction, from one query grouped by transaction date."""
+    date_from = datetime(year, month, 1)
+    date_to = datetime(year + month // 12, month % 12 + 1, 1)
+    records = session.query(Transaction.tr_date,
+                            func.count(func.distinct(Transaction.project_id)),
+                            func.coalesce(func.sum(TransactionDetails.present
+                                                   + TransactionDetails.absent
+                                                   + TransactionDetails.vacation), 0))\
+        .outerjoin(TransactionDetails, TransactionDetails.transaction_id == Transaction.id)\
+        .filter(Transaction.tr_date >= date_from)\
+        .filter(Transaction.tr_date < date_to)\
+        .group_by(Transaction.tr_date)\
+        .all()
+    return {tr_date.day: DayStatus(projects, headcount) for tr_date, projects, headcount in records}
+
+
+# One designation line of a project on a given date.
+DetailLine = namedtuple('DetailLine', 'designation present absent vacation')
+
+
+def cached_details(tr_date, project_name):
+    """Return the details of a project on tr_date if they are cached, or
+    None."""
+    return DAYS.get(('details', tr_date, project_name))
+
+
+def project_details(session, tr_date, project_name):
+    """Return the designation lines entered for a project on a date.
+
+    Project and designation names come from the name caches, so only
+    the transaction tables are read. The lines are kept in the day cache
+    like the summary.
+    """
+    lines = cached_details(tr_date, project_name)
+    if lines is not None:
+        return lines
+    generation = DAYS.generation
+    project_id = PROJECTS.id_of(session, project_name)
+    if project_id is None:
+        return []
+    records = session.query(TransactionDetails.designation_id, TransactionDetails.present,
+                            TransactionDetails.absent, TransactionDetails.vacation)\
+        .join(Transaction, TransactionDetails.transaction_id == Transaction.id)\
+        .filter(Transaction.project_id == project_id)\
+        .filter(Transaction.tr_date == tr_date)\
+        .order_by(TransactionDetails.id)\
+        .all()
+    lines = [DetailLine(DESIGNATIONS.name_of(session, designation_id), present, absent, vacation)
+             for designation_id, present, absent, vacation in records]
+    return DAYS.put(('details', tr_date, project_name), tr_date, tr_date, lines, generation)
+
+
+# Totals of a date range, per project or per project and designation.
+# days counts the days with manpower entered, average is the present
+# manpower per such day and peak the highest present of one day.
+RangeLine = namedtuple('RangeLine', 'project designation present absent vacation days average peak')
+RangeReport = namedtuple('RangeReport', 'date_from date_to projects lines')
+
+
+def _range_line(project, designation, present, absent, vacation, days, peak):
+    average = round(present / days, 1) if days else 0
+    return RangeLine(project, designation, present, absent, vacation, days, average, peak)
+
+
+def range_report(session, date_from, date_to):
+    """Return the manpower totals between two dates, both included.
+
+    Everything is summed in SQL from the daily rollup, one grouped query
+    per project and one per project and designation, so the time taken
+    does not depend on the number of detail lines entered.
+    """
+    by_designation = session.query(Project.name, Designation.name,
+                                   func.sum(DailyRollup.present),
+                                   func.sum(DailyRollup.absent),
+                                   func.sum(DailyRollup.vacation),
+                                   func.count(DailyRollup.tr_date),
+                                   func.max(DailyRollup.present))\
+        .join(Project, DailyRollup.project_id == Project.id)\
+        .join(Designation, DailyRollup.designation_id == Designation.id)\
+        .filter(DailyRollup.tr_date >= date_from)\
+        .filter(DailyRollup.tr_date <= date_to)\
+        .group_by(Project.id, Project.name, Designation.id, Designation.name)\
+        .order_by(Project.id, Designation.name)\
+        .all()
+
+    # The daily totals of each project, for the peak of a whole project.
+    daily = session.query(DailyRollup.project_id,
+                          func.sum(DailyRollup.present).label('present'),
+                          func.sum(DailyRollup.absent).label('absent'),
+                          func.sum(DailyRollup.vacation).label('vacation'))\
+        .filter(DailyRollup.tr_date >= date_from)\
+        .filter(DailyRollup.tr_date <= date_to)\
+        .group_by(DailyRollup.tr_date, DailyRollup.project_id)\
+        .subquery()
+    by_project = session.query(Project.name,
+                               func.sum(daily.c.present),
+                               func.sum(daily.c.absent),
+                               func.sum(daily.c.vacation),
+                               func.count(),
+                               func.max(daily.c.present))\
+        .join(daily, daily.c.project_id == Project.id)\
+        .group_by(Project.id, Project.name)\
+        .order_by(Project.id)\
+        .all()
+
+    projects = [_range_line(name, None, *values) for name, *values in by_project]
+    lines = [_range_line(*record) for record in by_designation]
+    return RangeReport(date_from, date_to, projects, lines)
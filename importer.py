@@ -0,0 +1,288 @@
+#!/usr/bin/python3
+"""Import legacy manpower sheets into the database.
+
+The sheets need a heading row with Date, Project, Designation, Present,
+Absent and Vacation columns, Remarks is optional and other columns, like
+the Total of the exported sheets, are ignored. CSV files and every sheet
+of XLSX files are read:
+
+    python -m manpower import 2019.xlsx 2020.xlsx 2021.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import update
+
+from dtbase.dtbase import Project, Designation, Transaction, TransactionDetails
+from dtbase.lookup import PROJECTS, DESIGNATIONS
+from dtbase import rollup
+
+REQUIRED_COLUMNS = ('date', 'project', 'designation', 'present', 'absent', 'vacation')
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S')
+# Detail rows inserted and committed at a time.
+BATCH_SIZE = 5000
+
+
+class SheetError(ValueError):
+    """Raised when a sheet can not be imported, the message says where."""
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    value = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    raise ValueError(f'{value} is not a date')
+
+
+def parse_count(value):
+    if value is None or value == '':
+        return 0
+    return int(float(value))
+
+
+def _columns(heading, source):
+    names = [str(name).strip().lower() if name is not None else '' for name in heading]
+    missing = [name for name in REQUIRED_COLUMNS if name not in names]
+    if len(missing) != 0:
+        raise SheetError(f'{source}: missing column(s) {", ".join(missing)}')
+    columns = [names.index(name) for name in REQUIRED_COLUMNS]
+    columns.append(names.index('remarks') if 'remarks' in names else None)
+    return columns
+
+
+def _parse_rows(rows, source):
+    """Turn the raw rows of one sheet into
+    (tr_date, project, designation, present, absent, vacation, remarks)."""
+    heading = next(rows, None)
+    if heading is None:
+        return
+    columns = _columns(heading, source)
+    for line, row in enumerate(rows, 2):
+        row = list(row) + [None] * (len(heading) - len(row))
+        values = [row[column] if column is not None else None for column in columns]
+        if all(value is None or value == '' for value in values):
+            continue
+        tr_date, project, designation, present, absent, vacation, remarks = values
+        if project is None or designation is None or str(project).strip() == '' \
+                or str(designation).strip() == '':
+            raise SheetError(f'{source} line {line}: project and designation are required')
+        try:
+            yield (parse_date(tr_date), str(project).strip(), str(designation).strip(),
+                   parse_count(present), parse_count(absent), parse_count(vacation),
+                   str(remarks).strip() if remarks is not None else '')
+        except ValueError as error:
+            raise SheetError(f'{source} line {line}: {error}')
+
+
+def read_csv(filename):
+    with open(filename, newline='', encoding='utf-8-sig') as csv_file:
+        yield from _parse_rows(csv.reader(csv_file), filename)
+
+
+def read_xlsx(filename):
+    from openpyxl import load_workbook
+    # Read-only mode streams the rows instead of loading the whole
+    # workbook in memory.
+    wb = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            yield from _parse_rows(ws.iter_rows(values_only=True), f'{filename} [{ws.title}]')
+    finally:
+        wb.close()
+
+
+def read_rows(filename):
+    """Yield the rows of a CSV or XLSX sheet one at a time."""
+    if filename.lower().endswith('.csv'):
+        return read_csv(filename)
+    elif filename.lower().endswith(('.xlsx', '.xlsm')):
+        return read_xlsx(filename)
+    raise SheetError(f'{filename}: only csv and xlsx files can be imported')
+
+
+class Importer:
+    """Load rows in batches, creating the missing projects, designations
+    and transactions on the way.
+
+    Names and transactions are looked up in dictionaries, filled once
+    per name or date, so no query is made per row. Rows of the same date
+    and project go to one transaction, the one already saved if there is
+    one. Rows of a date, project and designation saved before the import
+    are skipped, so importing a sheet twice does not count it twice.
+    Each batch is committed together with its change of the rollup.
+    """
+    def __init__(self, session, batch_size=BATCH_SIZE, progress=None):
+        self.session = session
+        self.batch_size = batch_size
+        self.progress = progress
+        self.project_ids = PROJECTS.ids(session)
+        self.designation_ids = DESIGNATIONS.ids(session)
+        self.trans_ids = {}
+        # Transactions still without remarks.
+        self.no_remarks = set()
+        # (date, project id, designation id) saved before the import.
+        self.existing = set()
+        self.dates = set()
+        self.count = 0
+        self.skipped = 0
+
+    def _name_id(self, cache, model, name):
+        name_id = cache.get(name)
+        if name_id is None:
+            record = model(name=name)
+            self.session.add(record)
+            self.session.flush()
+            name_id = cache[name] = record.id
+        return name_id
+
+    def _load_dates(self, dates):
+        """Read the transactions and details saved on dates not seen yet."""
+        dates = [tr_date for tr_date in dates if tr_date not in self.dates]
+        if len(dates) == 0:
+            return
+        records = self.session.query(Transaction.id, Transaction.tr_date, Transaction.project_id,
+                                     Transaction.remarks)\
+            .filter(Transaction.tr_date.in_(dates))\
+            .order_by(Transaction.id)
+        for trans_id, tr_date, project_id, remarks in records:
+            if (tr_date, project_id) not in self.trans_ids:
+                self.trans_ids[(tr_date, project_id)] = trans_id
+                if not remarks:
+                    self.no_remarks.add(trans_id)
+        records = self.session.query(Transaction.tr_date, Transaction.project_id,
+                                     TransactionDetails.designation_id)\
+            .join(TransactionDetails, TransactionDetails.transaction_id == Transaction.id)\
+            .filter(Transaction.tr_date.in_(dates))
+        self.existing.update(tuple(record) for record in records)
+        self.dates.update(dates)
+
+    def _write(self, rows):
+        self._load_dates({row[0] for row in rows})
+        new_trans = {}
+        remarks_of = {}
+        details = []
+        for tr_date, project, designation, present, absent, vacation, remarks in rows:
+            key = (tr_date, self._name_id(self.project_ids, Project, project))
+            designation_id = self._name_id(self.designation_ids, Designation, designation)
+            if key + (designation_id,) in self.existing:
+                self.skipped += 1
+                continue
+            trans_id = self.trans_ids.get(key)
+            if trans_id is None:
+                if key not in new_trans:
+                    new_trans[key] = Transaction(tr_date=tr_date, project_id=key[1], remarks=remarks)
+                elif new_trans[key].remarks == '':
+                    new_trans[key].remarks = remarks
+            elif remarks != '' and trans_id in self.no_remarks:
+                remarks_of[trans_id] = remarks
+                self.no_remarks.discard(trans_id)
+            details.append((key, designation_id, present, absent, vacation))
+        if len(new_trans) != 0:
+            self.session.add_all(new_trans.values())
+            self.session.flush()
+            for key, record in new_trans.items():
+                self.trans_ids[key] = record.id
+                if record.remarks == '':
+                    self.no_remarks.add(record.id)
+        for trans_id, remarks in remarks_of.items():
+            self.session.execute(update(Transaction).where(Transaction.id == trans_id).values(remarks=remarks))
+
+        if len(details) != 0:
+            params = []
+            deltas = {}
+            for key, designation_id, present, absent, vacation in details:
+                params.append({'transaction_id': self.trans_ids[key], 'designation_id': designation_id,
+                               'present': present, 'absent': absent, 'vacation': vacation})
+                amounts = deltas.setdefault(key, {}).get(designation_id, (0, 0, 0))
+                deltas[key][designation_id] = (amounts[0] + present, amounts[1] + absent,
+                                               amounts[2] + vacation)
+            self.session.execute(TransactionDetails.__table__.insert(), params)
+            # Committed with the details, so the rollup always counts them.
+            for (tr_date, project_id), designation_deltas in deltas.items():
+                rollup.apply_deltas(self.session, tr_date, project_id, designation_deltas)
+        self.session.commit()
+        # Only the ids are kept, the records would pile up in the session.
+        self.session.expunge_all()
+
+        self.count += len(details)
+        if self.progress is not None:
+            self.progress(self.count)
+
+    def load(self, rows):
+        """Insert every row of the iterable, committing each batch."""
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                self._write(batch)
+                batch = []
+        if len(batch) != 0:
+            self._write(batch)
+
+
+def import_files(session, filenames, progress=None):
+    """Import every file and return the number of detail rows loaded and
+    the number skipped because they were saved before.
+
+    progress(count) is called after each committed batch. Batches
+    already committed stay in the database, counted by the rollup, if a
+    later row is invalid.
+    """
+    importer = Importer(session, progress=progress)
+    try:
+        for filename in filenames:
+            importer.load(read_rows(filename))
+    except Exception:
+        session.rollback()
+        raise
+    return importer.count, importer.skipped
+
+
+def main(argv=None):
+    """Command line entry point of the importer."""
+    parser = argparse.ArgumentParser(prog='manpower import',
+                                     description='Import legacy manpower sheets into the database.')
+    parser.add_argument('files', nargs='+', help='csv or xlsx files to import')
+    args = parser.parse_args(argv)
+
+    for filename in args.files:
+        if not os.path.isfile(filename):
+            parser.error(f'{filename} does not exist')
+
+    def progress(count):
+        print(f'\rImported {count} row(s)...', end='', file=sys.stderr, flush=True)
+
+    from dtbase.connection import CONNECT_ERRORS, init_db, session_scope, error_message
+    try:
+        init_db()
+    except CONNECT_ERRORS as error:
+        print(error_message(error), file=sys.stderr)
+        return 2
+    start = datetime.now()
+    try:
+        with session_scope() as session:
+            count, skipped = import_files(session, args.files, progress)
+    except SheetError as error:
+        print(f'\n{error}', file=sys.stderr)
+        return 1
+    except CONNECT_ERRORS as error:
+        print(f'\n{error_message(error)}', file=sys.stderr)
+        return 2
+    seconds = (datetime.now() - start).total_seconds()
+    print(f'\rImported {count} row(s) in {seconds:.1f} seconds.', file=sys.stderr)
+    if skipped != 0:
+        print(f'Skipped {skipped} row(s) already in the database.', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
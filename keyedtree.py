@@ -0,0 +1,76 @@
+"""Keeps a ttk.Treeview in step with a list of keyed rows.
+
+Refreshing a grid by deleting every item and inserting them again makes
+Tk redraw the whole widget and loses the selection and scroll position.
+KeyedTree remembers what it has shown and only inserts, updates, moves
+or deletes the items that changed.
+"""
+
+
+class KeyedTree:
+    def __init__(self, tree, stripes=('odd', 'even')):
+        self.tree = tree
+        self.stripes = stripes
+        # (text, values, tags) of every item shown, by iid, and their order.
+        self.shown = {}
+        self.order = []
+        # Number of striped rows shown, the next one is odd when even.
+        self.counter = 0
+
+    def _stripe(self, tag, counter):
+        """Rows without their own tag get the odd/even striping."""
+        if tag is None:
+            return (self.stripes[counter % 2],), counter + 1
+        return (tag,), counter
+
+    def sync(self, rows):
+        """Show rows, a sequence of (iid, text, values, tag), in order.
+
+        tag is None for normal rows, which are striped, or the tag of a
+        special row such as a total.
+        """
+        rows = [(str(iid), text, tuple(values), tag) for iid, text, values, tag in rows]
+        keep = set(row[0] for row in rows)
+        stale = [iid for iid in self.order if iid not in keep]
+        if len(stale) != 0:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self.shown[iid]
+        kept = [iid for iid in self.order if iid in keep]
+        # Only move items when the order of the remaining ones changed.
+        in_place = kept == [row[0] for row in rows if row[0] in self.shown]
+
+        counter = 0
+        for index, (iid, text, values, tag) in enumerate(rows):
+            tags, counter = self._stripe(tag, counter)
+            state = (text, values, tags)
+            old = self.shown.get(iid)
+            if old is None:
+                self.tree.insert('', index, iid, text=text, values=values, tags=tags)
+            else:
+                if old != state:
+                    self.tree.item(iid, text=text, values=values, tags=tags)
+                if not in_place:
+                    self.tree.move(iid, '', index)
+            self.shown[iid] = state
+        self.order = [row[0] for row in rows]
+        self.counter = counter
+
+    def append(self, rows):
+        """Add rows after the ones shown, for grids loaded page by page."""
+        counter = self.counter
+        for iid, text, values, tag in rows:
+            iid = str(iid)
+            tags, counter = self._stripe(tag, counter)
+            values = tuple(values)
+            self.tree.insert('', 'end', iid, text=text, values=values, tags=tags)
+            self.shown[iid] = (text, values, tags)
+            self.order.append(iid)
+        self.counter = counter
+
+    def clear(self):
+        if len(self.order) != 0:
+            self.tree.delete(*self.order)
+        self.shown = {}
+        self.order = []
+        self.counter = 0
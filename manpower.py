@@ -1,26 +1,52 @@
 #!/usr/bin/python3
 
+import time
+import sys
+
+# Startup stages as (name, time) pairs, see print_startup_time().
+STARTUP = [('interpreter', time.perf_counter())]
+
+if __name__ == '__main__' and sys.argv[1:2] == ['report']:
+    # Reports run headless, without tkinter or a display.
+    from reports import main as report_main
+    sys.exit(report_main(sys.argv[2:]))
+
+if __name__ == '__main__' and sys.argv[1:2] == ['import']:
+    from importer import main as import_main
+    sys.exit(import_main(sys.argv[2:]))
+
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox as mb
 from tkinter import filedialog as fd
-from tkinter.scrolledtext import ScrolledText
-import sys
 import os
-from fpdf import FPDF
-from PIL import Image, ImageTk
-import csv
 import glob
-import subprocess
+import json
 import calendar as cl
-from openpyxl import Workbook
-import webbrowser
-from datetime import datetime
-import time
+from datetime import datetime, timedelta
+STARTUP.append(('tkinter', time.perf_counter()))
+
+from PIL import Image, ImageTk
+STARTUP.append(('pillow', time.perf_counter()))
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, join
+# The reporting modules (reports, fpdf, openpyxl) and webbrowser are
+# imported by the methods that use them so they do not slow down the
+# first paint of the main window.
+from sqlalchemy.exc import IntegrityError
 from dtbase.dtbase import *
+from dtbase.connection import HOME_DIR, DBSession, ConfigError, CONNECT_ERRORS, init_db, session_scope, check_database, error_message
+from dtbase.summary import daily_summary, summary_totals, project_details, range_report, cached_summary, cached_details, summary_range, month_status
+from dtbase import rollup, bulk
+from dtbase.cache import mark_changed
+from dtbase.history import history_page, page_key
+from dtbase.lookup import list_names, search_names, PROJECTS, DESIGNATIONS
+from dtbase.search import search_transactions
+from dtbase.dashboard import dashboard_data
+from dtbase import instrument
+from dtbase.instrument import traced
+from dbexecutor import get_executor
+from keyedtree import KeyedTree
+STARTUP.append(('sqlalchemy models', time.perf_counter()))
 
 
 __version__ = '1.0.0'
@@ -28,36 +54,116 @@ __author__ = 'Jesus Vedasto Olazo'
 __email__ = 'jestoy.olazo@gmail.com'
 __license__ = 'MIT'
 
-HOME_DIR = os.path.join(os.path.expanduser('~'), '.manpower_mngt')
-DB_FILE = os.path.join(HOME_DIR, 'manpower_db.db')
-ENGINE = create_engine(f'sqlite:///{DB_FILE}')
-
-if not os.path.isdir(HOME_DIR):
-    os.mkdir(HOME_DIR)
-
-if not os.path.isfile(DB_FILE):
-    Base.metadata.create_all(ENGINE)
-
-Base.metadata.bind = ENGINE
-DBSession = sessionmaker(bind=ENGINE)
+# Set by --profile or the MANPOWER_PROFILE environment variable, the
+# queries of each action are then timed, see dtbase/instrument.py.
+PROFILE = False
+PROFILE_LOG = os.path.join(HOME_DIR, 'profile.log')
+
+# Process-wide cache of Tk icons keyed by (name, size).
+ICON_CACHE = {}
+ICON_DIR = 'images'
+ATLAS_DIR = os.path.join(HOME_DIR, 'icons')
+# Pre-resized icon strips by size as (image, {name: position}). None
+# means the strip could not be built and icons are loaded one by one.
+ATLASES = {}
+
+def _load_atlas(size):
+    """Return the strip holding every icon of the given size, building
+    it with Pillow the first time or when an icon file has changed.
+
+    The strip is decoded by Tk once per process and icons are copied out
+    of it as they are needed, so opening a window decodes no image file.
+    """
+    sources = sorted(glob.glob(os.path.join(ICON_DIR, '*.png')))
+    if len(sources) == 0:
+        return None
+    names = [os.path.basename(src).split('.')[0] for src in sources]
+    newest = max(os.path.getmtime(src) for src in sources)
+    width, height = size
+    atlas_file = os.path.join(ATLAS_DIR, f'{width}x{height}.png')
+    index_file = os.path.join(ATLAS_DIR, f'{width}x{height}.json')
+    try:
+        with open(index_file, 'r') as idx_file:
+            index = json.load(idx_file)
+        fresh = index['names'] == names and index['mtime'] >= newest
+    except (OSError, ValueError, KeyError):
+        fresh = False
+    try:
+        if not fresh:
+            os.makedirs(ATLAS_DIR, exist_ok=True)
+            strip = Image.new('RGBA', (width * len(sources), height))
+            for idx, src in enumerate(sources):
+                strip.paste(Image.open(src).convert('RGBA').resize(size), (idx * width, 0))
+            strip.save(atlas_file)
+            with open(index_file, 'w') as idx_file:
+                json.dump({'names': names, 'mtime': newest}, idx_file)
+        atlas = tk.PhotoImage(file=atlas_file)
+    except (OSError, tk.TclError):
+        return None
+    return atlas, {name: idx for idx, name in enumerate(names)}
+
+def load_icon(name, size=(16, 16)):
+    """Return the icon of the given name and size, loading it only once
+    per process."""
+    size = tuple(size)
+    key = (name, size)
+    if key in ICON_CACHE:
+        return ICON_CACHE[key]
+    if size not in ATLASES:
+        ATLASES[size] = _load_atlas(size)
+    atlas = ATLASES[size]
+    if atlas is not None and name in atlas[1]:
+        width, height = size
+        left = atlas[1][name] * width
+        icon = tk.PhotoImage(width=width, height=height)
+        icon.tk.call(icon, 'copy', atlas[0], '-from', left, 0, left + width, height)
+    else:
+        path_to_file = os.path.join(ICON_DIR, f'{name}.png')
+        icon = ImageTk.PhotoImage(Image.open(path_to_file).resize(size))
+    ICON_CACHE[key] = icon
+    return icon
+
+class IconSet:
+    """Dictionary-like access to the icons of one size. Nothing is loaded
+    until an icon is asked for."""
+    def __init__(self, size):
+        self.size = tuple(size)
+
+    def __getitem__(self, name):
+        return load_icon(name, self.size)
 
 def image_list(size=(16, 16)):
-    """This creates a dictionary of image file path for software icons."""
-    img_lst = {}
-    for img in glob.glob('images/*.png'):
-        path_to_file = img
-        img = os.path.basename(img)
-        file_name = img.split('.')[0]
-        img_lst[file_name] = ImageTk.PhotoImage(Image.open(path_to_file).resize(size))
-    return img_lst
+    """This returns the software icons of the given size by file name."""
+    return IconSet(size)
+
+def open_file(filename):
+    """Open a saved report with the default application of the system."""
+    import subprocess
+    if os.name == 'nt':
+        CREATE_NO_WINDOW = 0x08000000
+        subprocess.call(["start", filename], creationflags=CREATE_NO_WINDOW, shell=True)
+    else:
+        subprocess.call(["xdg-open", filename])
+
+def mix_color(low, high, share):
+    """Return the '#rrggbb' color share of the way from low to high."""
+    share = min(max(share, 0), 1)
+    low = [int(low[i:i+2], 16) for i in (1, 3, 5)]
+    high = [int(high[i:i+2], 16) for i in (1, 3, 5)]
+    return '#' + ''.join(f'{round(a + (b - a) * share):02x}' for a, b in zip(low, high))
 
 # Start of MainWindow class
 class MainWindow(ttk.Frame):
+    # Days before and after the shown date whose summaries are fetched
+    # in the background, on top of the rest of its month.
+    PREFETCH_DAYS = 1
+
     def __init__(self, master=None, *args, **kwargs):
         super(MainWindow, self).__init__(master, *args, **kwargs)
         self.master.protocol('WM_DELETE_WINDOW', self.close_app)
         #self.master.geometry(f'{950}x{600}+{20}+{10}')
         self.master.title(f'Manpower Management {__version__}')
+        self.executor = get_executor(self)
         self.img_list = image_list()
         self.img_list36 = image_list(size=(36, 36))
         if os.name == 'nt':
@@ -85,10 +191,15 @@ class MainWindow(ttk.Frame):
         filemenu.add_command(label='Project', image=self.img_list['project1'], compound=tk.LEFT, command=self.project_window)
         filemenu.add_command(label='Designation', image=self.img_list['contractor'], compound=tk.LEFT, command=self.designation_window)
         filemenu.add_command(label='Transaction', image=self.img_list['labors'], compound=tk.LEFT, command=self.designation_window)
+        filemenu.add_command(label='Dashboard', image=self.img_list['status'], compound=tk.LEFT, command=self.dashboard_window)
+        filemenu.add_separator()
+        filemenu.add_command(label='Import Sheets...', image=self.img_list['plus'], compound=tk.LEFT, command=self.import_records)
         filemenu.add_separator()
         filemenu.add_command(label='Quit', image=self.img_list['quit'], compound=tk.LEFT, command=self.close_app)
 
         helpmenu.add_command(label='Help', image=self.img_list['help'], compound=tk.LEFT, command=self.show_help)
+        if PROFILE:
+            helpmenu.add_command(label='Query Profile', image=self.img_list['status'], compound=tk.LEFT, command=self.profile_window)
         helpmenu.add_separator()
         helpmenu.add_command(label='About', image=self.img_list['about'], compound=tk.LEFT, command=self.show_about)
 
@@ -109,6 +220,8 @@ class MainWindow(ttk.Frame):
         desig_btn.pack(side=tk.LEFT)
         tr_btn = ttk.Button(title_frame, image=self.img_list36['labors'], command=self.transaction_window)
         tr_btn.pack(side=tk.LEFT)
+        dash_btn = ttk.Button(title_frame, image=self.img_list36['status'], command=self.dashboard_window)
+        dash_btn.pack(side=tk.LEFT)
         app_lbl = tk.Label(title_frame, text=f'Manpower\nManagement {__version__}', font='Times 19 bold italic', fg='#FF2100')
         app_lbl.pack(side=tk.RIGHT)
 
@@ -120,11 +233,14 @@ class MainWindow(ttk.Frame):
         self.search_entry.insert(tk.END, datetime.strftime(datetime.now(), '%d/%m/%Y'))
         cal_btn = ttk.Button(search_frame, image=self.img_list['calendar'], command=self.change_date)
         cal_btn.pack(side=tk.LEFT)
+        self.master.bind('<Control-Left>', lambda event: self.step_date(-1))
+        self.master.bind('<Control-Right>', lambda event: self.step_date(1))
 
         # All widgets for view_frame
         cols = ('project', 'present', 'absent', 'vacation', 'total', 'remarks')
         self.manp_view = ttk.Treeview(view_frame, columns=cols)
         self.manp_view.pack(expand=True, fill=tk.BOTH, side=tk.LEFT)
+        self.manp_rows = KeyedTree(self.manp_view)
         self.manp_view.heading('#0', text='S. No.')
         self.manp_view.column('#0', width=60, stretch=False, anchor=tk.CENTER)
         self.manp_view.bind('<<TreeviewSelect>>', self.load_details)
@@ -149,6 +265,7 @@ class MainWindow(ttk.Frame):
         details_frame.pack(side=tk.RIGHT, fill=tk.Y)
         self.dets_view = ttk.Treeview(details_frame)
         self.dets_view.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+        self.dets_rows = KeyedTree(self.dets_view)
 
         self.dets_view.tag_configure("odd", background="#d5f4e6", font=('Times', 11, ''))
         self.dets_view.tag_configure("even", background="#80ced6", font=('Times', 11, ''))
@@ -169,92 +286,178 @@ class MainWindow(ttk.Frame):
         # All widgets for btn_frame
         export_btn = ttk.Button(btn_frame, text='Export', image=self.img_list['export'], compound=tk.LEFT, command=self.export_records)
         export_btn.pack(side=tk.LEFT)
+        range_btn = ttk.Button(btn_frame, text='Export Range', image=self.img_list['export'], compound=tk.LEFT, command=self.export_range)
+        range_btn.pack(side=tk.LEFT)
         print_btn = ttk.Button(btn_frame, text='Print', image=self.img_list['printer'], compound=tk.LEFT, command=self.print_record)
         print_btn.pack(side=tk.LEFT)
+        report_btn = ttk.Button(btn_frame, text='Range Report', image=self.img_list['summary'], compound=tk.LEFT, command=self.range_window)
+        report_btn.pack(side=tk.LEFT)
         close_btn = ttk.Button(btn_frame, text='Close', image=self.img_list['cancel'], compound=tk.LEFT, command=self.close_app)
         close_btn.pack(side=tk.RIGHT)
 
-        self.update_view()
         self.search_entry.focus_set()
 
+    def connect_database(self, on_ready=None):
+        """Open the database and fill the view, called once the window
+        has been drawn so that the user is not looking at a blank screen.
+
+        Opening runs on a worker thread: upgrading an older database
+        rebuilds the rollup and the search index, which takes a while on
+        years of history. A small window tells the user to wait if it
+        is not done quickly. on_ready() is called once the view is
+        filled."""
+        self.update_idletasks()
+        STARTUP.append(('first paint', time.perf_counter()))
+        self.opening = True
+        self.opening_win = None
+        self.on_ready = on_ready
+        self.executor.submit(open_database, callback=self.database_ready, errback=self.database_failed)
+        self.after(300, self.show_opening)
+
+    def show_opening(self):
+        if not self.opening:
+            return
+        self.opening_win = tk.Toplevel(self)
+        self.opening_win.title('Opening Database')
+        self.opening_win.transient(self.master)
+        self.opening_win.resizable(False, False)
+        # Closing it would leave the main window usable too early.
+        self.opening_win.protocol('WM_DELETE_WINDOW', lambda: None)
+        info_lbl = ttk.Label(self.opening_win, text='Opening the database, an upgrade may take a few minutes...')
+        info_lbl.pack(padx=20, pady=(15, 5))
+        progress_bar = ttk.Progressbar(self.opening_win, mode='indeterminate', length=300)
+        progress_bar.pack(padx=20, pady=(5, 15))
+        progress_bar.start(15)
+        self.opening_win.grab_set()
+
+    def database_opened(self):
+        self.opening = False
+        if self.opening_win is not None:
+            self.opening_win.destroy()
+            self.opening_win = None
+
+    def database_ready(self, engine):
+        self.database_opened()
+        if PROFILE:
+            instrument.enable(engine, PROFILE_LOG)
+        STARTUP.append(('database', time.perf_counter()))
+        self.update_view()
+        STARTUP.append(('summary view', time.perf_counter()))
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def database_failed(self, error):
+        self.database_opened()
+        title = 'Configuration' if isinstance(error, ConfigError) else 'Database'
+        message = error_message(error) if isinstance(error, CONNECT_ERRORS) else str(error)
+        mb.showerror(title, message, parent=self)
+        self.close_app()
+
+    @traced
     def load_details(self, event):
-        children = self.dets_view.get_children()
-        self.dets_view.delete(*children)
-        tr_date = datetime.strptime(self.search_entry.get(), '%d/%m/%Y')
         item = self.manp_view.focus()
-        session = DBSession()
-        if item != '':
-            proj = self.manp_view.item(item)['values'][0]
-            proj_rec = session.query(Project).filter(Project.name == proj).first()
-            trans_recs = session.query(TransactionDetails).join(Transaction).join(Designation).filter(Transaction.project == proj_rec).filter(Transaction.tr_date == tr_date).all()
-            sum_pre = 0
-            sum_abs = 0
-            sum_vac = 0
-            counter = 1
-            for trans_rec in trans_recs:
-                values = (trans_rec.designation.name, f'{trans_rec.present}', f'{trans_rec.absent}', f'{trans_rec.vacation}', f'{trans_rec.present+trans_rec.absent+trans_rec.vacation}')
-                if counter % 2 == 0:
-                    self.dets_view.insert('', tk.END, f'{counter}', text=f'{counter}', values=values, tags='even')
-                else:
-                    self.dets_view.insert('', tk.END, f'{counter}', text=f'{counter}', values=values, tags='odd')
-                sum_pre+=trans_rec.present
-                sum_abs+=trans_rec.absent
-                sum_vac+=trans_rec.vacation
-                counter+=1
-            values = ('Total', f'{sum_pre}', f'{sum_abs}', f'{sum_vac}', f'{sum_pre+sum_abs+sum_vac}')
-            self.dets_view.insert('', tk.END, 'total', text='', values=values, tags='total_color')
-        session.close()
+        if item == '' or item == 'total':
+            self.show_details([])
+            return
+        tr_date = datetime.strptime(self.search_entry.get(), '%d/%m/%Y')
+        proj = self.manp_view.item(item)['values'][0]
+        lines = cached_details(tr_date, proj)
+        if lines is not None:
+            self.executor.cancel('main-details')
+            self.show_details(lines)
+            return
+        self.executor.submit(project_details, tr_date, proj, callback=self.show_details, key='main-details', owner=self)
 
+    def show_details(self, lines):
+        if len(lines) == 0:
+            self.dets_rows.sync([])
+            return
+        rows = []
+        sum_pre = 0
+        sum_abs = 0
+        sum_vac = 0
+        counter = 1
+        for line in lines:
+            values = (line.designation, f'{line.present}', f'{line.absent}', f'{line.vacation}', f'{line.present+line.absent+line.vacation}')
+            rows.append((counter, f'{counter}', values, None))
+            sum_pre+=line.present
+            sum_abs+=line.absent
+            sum_vac+=line.vacation
+            counter+=1
+        values = ('Total', f'{sum_pre}', f'{sum_abs}', f'{sum_vac}', f'{sum_pre+sum_abs+sum_vac}')
+        rows.append(('total', '', values, 'total_color'))
+        self.dets_rows.sync(rows)
+
+    def selected_date(self):
+        try:
+            return datetime.strptime(self.search_entry.get(), '%d/%m/%Y')
+        except ValueError:
+            mb.showwarning('Invalid Date', 'Please enter the date as dd/mm/yyyy.', parent=self)
+            return None
+
+    @traced
     def update_view(self):
-        children = self.manp_view.get_children()
-        self.manp_view.delete(*children)
-        session = DBSession()
-        test_dict = {}
-        date_today = datetime.strptime(self.search_entry.get(), '%d/%m/%Y')
+        """Fetch the summary of the selected date on a worker thread. A
+        newer request, for example after picking another date, replaces
+        an older one still running. Dates seen recently and not changed
+        since are shown from the day cache right away."""
+        date_today = self.selected_date()
+        if date_today is None:
+            return
+        rows = cached_summary(date_today)
+        if rows is not None:
+            self.executor.cancel('main-summary')
+            self.show_summary(rows)
+            return
+        self.executor.submit(daily_summary, date_today, callback=self.show_summary, key='main-summary', owner=self)
 
+    def show_summary(self, rows):
+        self.show_details([])
+        # Keyed by project so a refresh only touches the changed rows.
+        items = []
+        counter = 1
+        for row in rows:
+            values = (row.project, f'{row.present}', f'{row.absent}', f'{row.vacation}', f'{row.present+row.absent+row.vacation}', row.remarks)
+            items.append((f'project-{row.project}', f'{counter}', values, None))
+            counter+=1
+        if len(rows) != 0:
+            pre_tl, abs_tl, vac_tl = summary_totals(rows)
+            values = ('Total', f'{pre_tl}', f'{abs_tl}', f'{vac_tl}', f'{pre_tl+abs_tl+vac_tl}', '' )
+            items.append(('total', '', values, 'total_color'))
+        self.manp_rows.sync(items)
+        self.after_idle(self.prefetch)
+
+    def prefetch(self):
+        """Fetch the summaries of the days around the shown date and of
+        the rest of its month into the day cache, in one job, so the
+        next dates the user is likely to pick show at once."""
         try:
-            proj_recs = session.query(Project).all()
-            for proj_rec in proj_recs:
-                trans_recs = session.query(Transaction).filter(Transaction.project == proj_rec).filter(Transaction.tr_date == date_today).all()
-                sum_present = 0
-                sum_absent = 0
-                sum_vacation = 0
-                remarks = ''
-                for trans_rec in trans_recs:
-                    details_recs = session.query(TransactionDetails).filter(TransactionDetails.transaction == trans_rec).all()
-                    remarks = trans_rec.remarks
-                    for details_rec in details_recs:
-                        #print(details_rec.present, details_rec.absent, details_rec.vacation)
-                        sum_present+=details_rec.present
-                        sum_absent+=details_rec.absent
-                        sum_vacation+=details_rec.vacation
-                if (sum_present+sum_absent+sum_vacation) != 0:
-                    test_dict[proj_rec.name] = (sum_present, sum_absent, sum_vacation, remarks)
-                else:
-                    if remarks != '':
-                        test_dict[proj_rec.name] = (sum_present, sum_absent, sum_vacation, remarks)
-            #print(test_dict)
-            counter = 1
-            pre_tl = 0
-            abs_tl = 0
-            vac_tl = 0
-            for k, v in test_dict.items():
-                values = (k, f'{v[0]}', f'{v[1]}', f'{v[2]}', f'{v[0]+v[1]+v[2]}', v[3] )
-                if counter % 2 == 0:
-                    self.manp_view.insert('', tk.END, f'{counter}', text=f'{counter}', tags='even', values=values)
-                else:
-                    self.manp_view.insert('', tk.END, f'{counter}', text=f'{counter}', tags='odd', values=values)
-                counter+=1
-                pre_tl+=v[0]
-                abs_tl+=v[1]
-                vac_tl+=v[2]
-            if len(test_dict) != 0:
-                values = ('Total', f'{pre_tl}', f'{abs_tl}', f'{vac_tl}', f'{pre_tl+abs_tl+vac_tl}', '' )
-                self.manp_view.insert('', tk.END, 'total', text='', tags='total_color', values=values)
-        except:
-            print(sys.exc_info())
-        finally:
-            session.close()
+            date_today = datetime.strptime(self.search_entry.get(), '%d/%m/%Y')
+        except ValueError:
+            return
+        first = date_today.replace(day=1)
+        last = first.replace(day=cl.monthrange(first.year, first.month)[1])
+        date_from = min(first, date_today - timedelta(days=self.PREFETCH_DAYS))
+        date_to = max(last, date_today + timedelta(days=self.PREFETCH_DAYS))
+        missing = []
+        day = date_from
+        while day <= date_to:
+            if cached_summary(day) is None:
+                missing.append(day)
+            day += timedelta(days=1)
+        if len(missing) == 0:
+            return
+        self.executor.submit(summary_range, missing[0], missing[-1], key='main-prefetch', owner=self)
+
+    def step_date(self, days):
+        """Show the summary of the day before or after, Ctrl+Left and
+        Ctrl+Right."""
+        date_today = self.selected_date()
+        if date_today is None:
+            return
+        self.search_entry.delete('0', tk.END)
+        self.search_entry.insert(tk.END, datetime.strftime(date_today + timedelta(days=days), '%d/%m/%Y'))
+        self.update_view()
 
     def project_window(self):
         tp = tk.Toplevel(self)
@@ -273,7 +476,18 @@ class MainWindow(ttk.Frame):
         self.wait_window(tp)
         self.update_view()
 
+    def dashboard_window(self):
+        tp = tk.Toplevel(self)
+        win = DashboardWindow(tp)
+        win.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+
+    def profile_window(self):
+        tp = tk.Toplevel(self)
+        win = ProfileWindow(tp)
+        win.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+
     def show_help(self):
+        import webbrowser
         webbrowser.open_new_tab('index.html')
 
     def show_about(self):
@@ -292,174 +506,316 @@ class MainWindow(ttk.Frame):
             self.search_entry.insert(tk.END, win.date)
             self.update_view()
 
+    @traced
     def export_records(self):
-        session = DBSession()
-        test_dict = {}
-        date_today = datetime.strptime(self.search_entry.get(), '%d/%m/%Y')
-
-        proj_recs = session.query(Project).all()
-        for proj_rec in proj_recs:
-            trans_recs = session.query(Transaction).filter(Transaction.project == proj_rec).filter(Transaction.tr_date == date_today).all()
-            sum_present = 0
-            sum_absent = 0
-            sum_vacation = 0
-            remarks = ''
-            for trans_rec in trans_recs:
-                details_recs = session.query(TransactionDetails).filter(TransactionDetails.transaction == trans_rec).all()
-                remarks = trans_rec.remarks
-                for details_rec in details_recs:
-                    #print(details_rec.present, details_rec.absent, details_rec.vacation)
-                    sum_present+=details_rec.present
-                    sum_absent+=details_rec.absent
-                    sum_vacation+=details_rec.vacation
-            if (sum_present+sum_absent+sum_vacation) != 0:
-                test_dict[proj_rec.name] = (sum_present, sum_absent, sum_vacation, remarks)
-            else:
-                if remarks != '':
-                    test_dict[proj_rec.name] = (sum_present, sum_absent, sum_vacation, remarks)
+        date_today = self.selected_date()
+        if date_today is not None:
+            self.executor.submit(daily_summary, date_today, callback=self.save_excel, owner=self)
 
+    def save_excel(self, rows):
         filename = fd.asksaveasfilename(parent=self, defaultextension='.xlsx', initialfile=f'Manpower-{self.search_entry.get().replace("/", "-")}.xlsx')
 
         if filename == '':
-            session.close()
             return
 
-        wb = Workbook()
-        ws = wb.active
-        heading = ('S. No.', 'Project', 'Present', 'Absent', 'Vacation', 'Total', 'Remarks')
-        letter = ('A', 'B', 'C', 'D', 'E', 'F', 'G')
-        for idx, value in enumerate(heading):
-            ws[f'{letter[idx]}1'] = value
-
-        counter = 2
-        for k, v in test_dict.items():
-            ws[f'A{counter}'] = counter - 1
-            ws[f'B{counter}'] = k
-            ws[f'C{counter}'] = v[0]
-            ws[f'D{counter}'] = v[1]
-            ws[f'E{counter}'] = v[2]
-            total = v[0] + v[1] + v[2]
-            ws[f'F{counter}'] = total
-            ws[f'G{counter}'] = v[3]
-            counter+=1
-        session.close()
-        wb.save(filename)
-        time.sleep(1)
-        if os.name == 'nt':
-            CREATE_NO_WINDOW = 0x08000000
-            subprocess.call(["start", filename], creationflags=CREATE_NO_WINDOW, shell=True)
+        from reports import write_xlsx, summary_sheet_rows, SUMMARY_HEADING
+        write_xlsx(filename, [('Manpower', SUMMARY_HEADING, summary_sheet_rows(rows))])
+        open_file(filename)
+
+    def export_range(self):
+        tp = tk.Toplevel(self)
+        win = ExportWindow(tp)
+        win.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+
+    def range_window(self):
+        tp = tk.Toplevel(self)
+        win = RangeReportWindow(tp)
+        win.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+
+    @traced
+    def import_records(self):
+        filenames = fd.askopenfilenames(parent=self, title='Import Sheets',
+                                        filetypes=[('Sheets', '*.xlsx *.csv'), ('All files', '*.*')])
+        if len(filenames) == 0:
+            return
+        from importer import import_files
+        # The worker thread only stores the count, it is shown in the
+        # title bar from the Tk thread.
+        self.import_count = 0
+        self.importing = True
+        self.show_import_progress()
+        self.executor.submit(import_files, list(filenames), self.set_import_count,
+                             callback=self.import_done, errback=self.import_failed)
+
+    def set_import_count(self, count):
+        self.import_count = count
+
+    def show_import_progress(self):
+        if self.importing:
+            self.master.title(f'Manpower Management {__version__} - Importing {self.import_count} row(s)...')
+            self.after(250, self.show_import_progress)
         else:
-            os.system("xdg-open %s"% (filename,))
+            self.master.title(f'Manpower Management {__version__}')
+
+    def import_done(self, result):
+        self.importing = False
+        count, skipped = result
+        message = f'{count} row(s) imported.'
+        if skipped != 0:
+            message += f'\n{skipped} row(s) skipped, already in the database.'
+        mb.showinfo('Import', message)
+        self.update_view()
 
+    def import_failed(self, error):
+        self.importing = False
+        mb.showerror('Import Failed', str(error))
+        self.update_view()
+
+    @traced
     def print_record(self):
-        session = DBSession()
-        test_dict = {}
-        date_today = datetime.strptime(self.search_entry.get(), '%d/%m/%Y')
+        date_today = self.selected_date()
+        if date_today is not None:
+            self.executor.submit(daily_summary, date_today, callback=self.save_pdf, owner=self)
+
+    def save_pdf(self, rows):
+        if len(rows) != 0:
+            filename = fd.asksaveasfilename(parent=self, defaultextension='.pdf',
+                                    initialfile=f'ManpowerSummary-{self.search_entry.get().replace("/", "")}')
+            if filename != '':
+                from reports import write_summary_pdf
+                write_summary_pdf(filename, self.search_entry.get(), rows)
+                open_file(filename)
 
+    def close_app(self):
+        self.executor.shutdown()
+        self.master.destroy()
+# End of MainWindow class
+
+# Start of ExportWindow class
+class ExportWindow(tk.Frame):
+    """Exports the manpower details of a date range to an excel file."""
+    def __init__(self, master=None, *args, **kwargs):
+        super(ExportWindow, self).__init__(master, *args, **kwargs)
+        self.master.protocol('WM_DELETE_WINDOW', self.close_app)
+        self.master.title('Export Range')
+        self.img_list = image_list()
+        self.img36_list = image_list(size=(36, 36))
+        if os.name == "nt":
+            self.master.iconbitmap('manpower.ico')
+        elif os.name == 'posix':
+            self.master.tk.call('wm', 'iconphoto', self.master._w, self.img36_list['manpower'])
+        self.setup_ui()
+
+    def setup_ui(self):
+        top_frame = ttk.Frame(self)
+        top_frame.pack(fill=tk.X, padx=5, pady=5)
+        bot_frame = ttk.Frame(self)
+        bot_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        date_now = datetime.now()
+        from_lbl = ttk.Label(top_frame, text='From:')
+        from_lbl.grid(row=0, column=0, sticky=tk.W)
+        self.from_entry = ttk.Entry(top_frame, width=15)
+        self.from_entry.grid(row=0, column=1, sticky=tk.W+tk.E, padx=5, pady=5)
+        self.from_entry.insert(tk.END, datetime.strftime(date_now.replace(day=1), '%d/%m/%Y'))
+        from_btn = ttk.Button(top_frame, image=self.img_list['calendar'])
+        from_btn.grid(row=0, column=2, sticky=tk.W)
+        from_btn.config(command=lambda: self.change_date(self.from_entry))
+
+        to_lbl = ttk.Label(top_frame, text='To:')
+        to_lbl.grid(row=1, column=0, sticky=tk.W)
+        self.to_entry = ttk.Entry(top_frame, width=15)
+        self.to_entry.grid(row=1, column=1, sticky=tk.W+tk.E, padx=5, pady=5)
+        self.to_entry.insert(tk.END, datetime.strftime(date_now, '%d/%m/%Y'))
+        to_btn = ttk.Button(top_frame, image=self.img_list['calendar'])
+        to_btn.grid(row=1, column=2, sticky=tk.W)
+        to_btn.config(command=lambda: self.change_date(self.to_entry))
+
+        self.per_month = tk.BooleanVar(value=True)
+        month_rb = ttk.Radiobutton(top_frame, text='One sheet per month', variable=self.per_month, value=True)
+        month_rb.grid(row=2, column=0, columnspan=3, sticky=tk.W)
+        single_rb = ttk.Radiobutton(top_frame, text='One single sheet', variable=self.per_month, value=False)
+        single_rb.grid(row=3, column=0, columnspan=3, sticky=tk.W)
+
+        self.export_btn = ttk.Button(bot_frame, text='Export', image=self.img_list['export'], compound=tk.LEFT, command=self.export_records)
+        self.export_btn.pack(side=tk.LEFT)
+        close_btn = ttk.Button(bot_frame, text='Close', image=self.img_list['cancel'], compound=tk.LEFT, command=self.close_app)
+        close_btn.pack(side=tk.RIGHT)
+
+    def change_date(self, entry):
+        date_now = datetime.today()
+        tp = tk.Toplevel(self)
+        win = CalendarWidget(date_now.year, date_now.month, tp)
+        win.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+        self.wait_window(tp)
+        if win.date is not None:
+            entry.delete('0', tk.END)
+            entry.insert(tk.END, win.date)
+
+    @traced
+    def export_records(self):
         try:
-            proj_recs = session.query(Project).all()
-            for proj_rec in proj_recs:
-                trans_recs = session.query(Transaction).filter(Transaction.project == proj_rec).filter(Transaction.tr_date == date_today).all()
-                sum_present = 0
-                sum_absent = 0
-                sum_vacation = 0
-                remarks = ''
-                for trans_rec in trans_recs:
-                    details_recs = session.query(TransactionDetails).filter(TransactionDetails.transaction == trans_rec).all()
-                    remarks = trans_rec.remarks
-                    for details_rec in details_recs:
-                        #print(details_rec.present, details_rec.absent, details_rec.vacation)
-                        sum_present+=details_rec.present
-                        sum_absent+=details_rec.absent
-                        sum_vacation+=details_rec.vacation
-                if (sum_present+sum_absent+sum_vacation) != 0:
-                    test_dict[proj_rec.name] = (sum_present, sum_absent, sum_vacation, remarks)
-                else:
-                    if remarks != '':
-                        test_dict[proj_rec.name] = (sum_present, sum_absent, sum_vacation, remarks)
-
-            if len(test_dict) != 0:
-                filename = fd.asksaveasfilename(parent=self, defaultextension='.pdf',
-                                        initialfile=f'ManpowerSummary-{self.search_entry.get().replace("/", "")}')
-                if filename != '':
-                    pdf = PDF('L')
-                    pdf.alias_nb_pages()
-                    pdf.add_page()
-                    pdf.set_font('Times', '', 12)
-                    pdf.cell(0, 10, 'Date: '+self.search_entry.get(), 0, 1)
-                    pdf.set_font('Times', 'BI', 12)
-                    pdf.set_fill_color(86, 159, 169)
-                    pdf.set_text_color(255, 255, 255)
-                    pdf.cell(20, 10, 'Sl. No.', 1, 0, 'C', True)
-                    pdf.cell(70, 10, 'Project', 1, 0, 'C', True)
-                    pdf.cell(28, 10, 'Present', 1, 0, 'C', True)
-                    pdf.cell(28, 10, 'Absent', 1, 0, 'C', True)
-                    pdf.cell(28, 10, 'Vacation', 1, 0, 'C', True)
-                    pdf.cell(28, 10, 'Total', 1, 0, 'C', True)
-                    pdf.cell(0, 10, 'Remarks', 1, 1, 'C', True)
-                    pdf.set_font('Times', '', 12)
-                    pdf.set_text_color(0, 0, 0)
-                    counter = 1
-                    sum_pre = 0
-                    sum_abs = 0
-                    sum_vac = 0
-                    for k,v in test_dict.items():
-                        if counter % 2 == 0:
-                            pdf.set_fill_color(152, 211, 219)
-                        else:
-                            pdf.set_fill_color(195, 223, 227)
-                        pdf.cell(20, 8, f'{counter}', 1, 0, 'C', True)
-                        pdf.cell(70, 8, k, 1, 0, '', True)
-                        pdf.cell(28, 8, f'{v[0]}', 1, 0, 'C', True)
-                        pdf.cell(28, 8, f'{v[1]}', 1, 0, 'C', True)
-                        pdf.cell(28, 8, f'{v[2]}', 1, 0, 'C', True)
-                        total = v[0] + v[1] + v[2]
-                        pdf.cell(28, 8, f'{total}', 1, 0, 'C', True)
-                        pdf.cell(0, 8, v[3], 1, 1, 'C', True)
-                        sum_pre+=v[0]
-                        sum_abs+=v[1]
-                        sum_vac+=v[2]
-                        counter+=1
-                    pdf.set_font('Times', 'BI', 12)
-                    if counter % 2 == 0:
-                        pdf.set_fill_color(152, 211, 219)
-                    else:
-                        pdf.set_fill_color(195, 223, 227)
-                    pdf.cell(20, 10, '', 1, 0, 'C', True)
-                    pdf.cell(70, 10, 'Total', 1, 0, 'C', True)
-                    pdf.cell(28, 10, f'{sum_pre}', 1, 0, 'C', True)
-                    pdf.cell(28, 10, f'{sum_abs}', 1, 0, 'C', True)
-                    pdf.cell(28, 10, f'{sum_vac}', 1, 0, 'C', True)
-                    pdf.cell(28, 10, f'{sum_pre+sum_abs+sum_vac}', 1, 0, 'C', True)
-                    pdf.cell(0, 10, '', 1, 1, 'C', True)
-                    pdf.output(filename, 'F')
-                    if os.name == 'nt':
-                        CREATE_NO_WINDOW = 0x08000000
-                        subprocess.call(["start", filename], creationflags=CREATE_NO_WINDOW, shell=True)
-                    else:
-                        os.system(f"xdg-open {filename}")
-        except:
-            print(sys.exc_info())
-        finally:
-            session.close()
+            date_from = datetime.strptime(self.from_entry.get(), '%d/%m/%Y')
+            date_to = datetime.strptime(self.to_entry.get(), '%d/%m/%Y')
+        except ValueError:
+            mb.showwarning('Invalid Date', 'Please enter the dates as dd/mm/yyyy.', parent=self)
+            return
+        initial = f'Manpower-{date_from:%d-%m-%Y}-to-{date_to:%d-%m-%Y}.xlsx'
+        filename = fd.asksaveasfilename(parent=self, defaultextension='.xlsx', initialfile=initial)
+        if filename == '':
+            return
+        from reports import export_range
+        # The export runs on a worker thread, the file is opened when done.
+        self.export_btn.config(state=tk.DISABLED)
+        get_executor(self).submit(export_range, filename, date_from, date_to, self.per_month.get(),
+                                  callback=lambda result: self.export_done(filename), errback=self.export_failed)
+
+    def export_done(self, filename):
+        open_file(filename)
+        if self.winfo_exists():
+            self.close_app()
+
+    def export_failed(self, error):
+        mb.showerror('Export Failed', str(error))
+        if self.winfo_exists():
+            self.export_btn.config(state=tk.NORMAL)
 
     def close_app(self):
         self.master.destroy()
-# End of MainWindow class
+# End of ExportWindow class
+
+# Start of RangeReportWindow class
+class RangeReportWindow(tk.Frame):
+    """Shows the manpower totals of a date range per project and
+    designation, with print and export to excel."""
+    def __init__(self, master=None, *args, **kwargs):
+        super(RangeReportWindow, self).__init__(master, *args, **kwargs)
+        self.master.protocol('WM_DELETE_WINDOW', self.close_app)
+        self.master.title('Range Report')
+        self.master.geometry('900x500')
+        self.img_list = image_list()
+        self.img36_list = image_list(size=(36, 36))
+        if os.name == "nt":
+            self.master.iconbitmap('manpower.ico')
+        elif os.name == 'posix':
+            self.master.tk.call('wm', 'iconphoto', self.master._w, self.img36_list['manpower'])
+        self.executor = get_executor(self)
+        self.report = None
+        self.setup_ui()
+        self.update_view()
+
+    def setup_ui(self):
+        top_frame = ttk.Frame(self)
+        top_frame.pack(fill=tk.X, padx=5, pady=5)
+        view_frame = ttk.Frame(self)
+        view_frame.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+        bot_frame = ttk.Frame(self)
+        bot_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        # The current month up to today by default.
+        date_now = datetime.now()
+        from_lbl = ttk.Label(top_frame, text='From:')
+        from_lbl.pack(side=tk.LEFT)
+        self.from_entry = ttk.Entry(top_frame, width=15)
+        self.from_entry.pack(side=tk.LEFT, padx=5)
+        self.from_entry.insert(tk.END, datetime.strftime(date_now.replace(day=1), '%d/%m/%Y'))
+        from_btn = ttk.Button(top_frame, image=self.img_list['calendar'], command=lambda: self.change_date(self.from_entry))
+        from_btn.pack(side=tk.LEFT)
+
+        to_lbl = ttk.Label(top_frame, text='To:')
+        to_lbl.pack(side=tk.LEFT, padx=(10, 0))
+        self.to_entry = ttk.Entry(top_frame, width=15)
+        self.to_entry.pack(side=tk.LEFT, padx=5)
+        self.to_entry.insert(tk.END, datetime.strftime(date_now, '%d/%m/%Y'))
+        to_btn = ttk.Button(top_frame, image=self.img_list['calendar'], command=lambda: self.change_date(self.to_entry))
+        to_btn.pack(side=tk.LEFT)
+
+        show_btn = ttk.Button(top_frame, text='Show', image=self.img_list['search'], compound=tk.LEFT, command=self.update_view)
+        show_btn.pack(side=tk.LEFT, padx=10)
+
+        cols = ('present', 'absent', 'vacation', 'total', 'days', 'average', 'peak')
+        self.report_view = ttk.Treeview(view_frame, columns=cols)
+        self.report_view.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        self.report_view.heading('#0', text='PROJECT / DESIGNATION')
+        self.report_view.column('#0', width=250)
+        for col in cols:
+            self.report_view.heading(col, text=col.upper())
+            self.report_view.column(col, width=80, stretch=False, anchor=tk.CENTER)
+
+        vbar = ttk.Scrollbar(view_frame, orient=tk.VERTICAL)
+        vbar.pack(side=tk.RIGHT, fill=tk.Y)
+        vbar.config(command=self.report_view.yview)
+        self.report_view['yscrollcommand'] = vbar.set
+
+        self.report_view.tag_configure("project", background="#80ced6", font=('Times', 11, 'bold'))
+        self.report_view.tag_configure("designation", background="#d5f4e6", font=('Times', 11, ''))
+
+        print_btn = ttk.Button(bot_frame, text='Print', image=self.img_list['printer'], compound=tk.LEFT, command=self.print_record)
+        print_btn.pack(side=tk.LEFT)
+        export_btn = ttk.Button(bot_frame, text='Export', image=self.img_list['export'], compound=tk.LEFT, command=self.export_record)
+        export_btn.pack(side=tk.LEFT)
+        close_btn = ttk.Button(bot_frame, text='Close', image=self.img_list['cancel'], compound=tk.LEFT, command=self.close_app)
+        close_btn.pack(side=tk.RIGHT)
 
-# Start of PDF class
-class PDF(FPDF):
-    def header(self):
-        self.set_font('Times', 'B', 20)
-        self.cell(0, 10, 'Al Hamra Construction Co. LLC', 0, 1, 'C')
-        self.set_font('Times', 'I', 17)
-        self.cell(0, 20, 'Daily Manpower Report', 0, 1, 'C')
+    def change_date(self, entry):
+        date_now = datetime.today()
+        tp = tk.Toplevel(self)
+        win = CalendarWidget(date_now.year, date_now.month, tp)
+        win.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+        self.wait_window(tp)
+        if win.date is not None:
+            entry.delete('0', tk.END)
+            entry.insert(tk.END, win.date)
 
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, 'Page ' + str(self.page_no()) + ' of {nb}', 0, 0, 'C')
-# End of PDF class
+    @traced
+    def update_view(self):
+        try:
+            date_from = datetime.strptime(self.from_entry.get(), '%d/%m/%Y')
+            date_to = datetime.strptime(self.to_entry.get(), '%d/%m/%Y')
+        except ValueError:
+            mb.showwarning('Invalid Date', 'Please enter the dates as dd/mm/yyyy.', parent=self)
+            return
+        self.executor.submit(range_report, date_from, date_to, callback=self.show_report, key=str(self), owner=self)
+
+    def show_report(self, report):
+        self.report = report
+        self.report_view.delete(*self.report_view.get_children())
+        parents = {}
+        for project in report.projects:
+            parents[project.project] = self.report_view.insert('', tk.END, text=project.project, values=self.values(project), tags='project', open=True)
+        for line in report.lines:
+            self.report_view.insert(parents[line.project], tk.END, text=line.designation, values=self.values(line), tags='designation')
+
+    def values(self, line):
+        total = line.present + line.absent + line.vacation
+        return (line.present, line.absent, line.vacation, total, line.days, line.average, line.peak)
+
+    def report_name(self):
+        return f'ManpowerReport-{self.report.date_from:%d-%m-%Y}-to-{self.report.date_to:%d-%m-%Y}'
+
+    def print_record(self):
+        if self.report is None or len(self.report.projects) == 0:
+            mb.showwarning('No record', 'There is no manpower in the given dates.', parent=self)
+            return
+        filename = fd.asksaveasfilename(parent=self, defaultextension='.pdf', initialfile=self.report_name())
+        if filename != '':
+            from reports import write_range_pdf
+            write_range_pdf(filename, self.report)
+            open_file(filename)
+
+    def export_record(self):
+        if self.report is None or len(self.report.projects) == 0:
+            mb.showwarning('No record', 'There is no manpower in the given dates.', parent=self)
+            return
+        filename = fd.asksaveasfilename(parent=self, defaultextension='.xlsx', initialfile=self.report_name())
+        if filename != '':
+            from reports import write_xlsx, range_sheets
+            write_xlsx(filename, range_sheets(self.report))
+            open_file(filename)
+
+    def close_app(self):
+        self.master.destroy()
+# End of RangeReportWindow class
 
 # Start of ProjectWindow class
 class ProjectWindow(tk.Frame):
@@ -501,6 +857,7 @@ class ProjectWindow(tk.Frame):
         self.proj_view = ttk.Treeview(mid_frame)
         self.proj_view.pack(expand=True, fill=tk.BOTH, side=tk.LEFT)
         self.proj_view['columns'] = ('project',)
+        self.proj_rows = KeyedTree(self.proj_view)
         self.proj_view.heading('#0', text='ID')
         self.proj_view.column('#0', width=50, stretch=False)
         self.proj_view.heading('project', text='PROJECT')
@@ -531,68 +888,49 @@ class ProjectWindow(tk.Frame):
 
         self.proj_entry.focus_set()
 
+    @traced
     def update_view(self):
-        session = DBSession()
-        records = session.query(Project).all()
-        children = self.proj_view.get_children()
-        if len(children) != 0:
-            for child in children:
-                self.proj_view.delete(child)
-        if not len(records) == 0:
-            counter = 1
-            for record in records:
-                if counter % 2 == 0:
-                    self.proj_view.insert('', tk.END, str(record.id), text=str(record.id), tags='even')
-                else:
-                    self.proj_view.insert('', tk.END, str(record.id), text=str(record.id), tags='odd')
-                self.proj_view.set(str(record.id), 'project', str(record.name))
-                counter+=1
-        session.close()
+        get_executor(self).submit(list_names, Project, callback=self.show_records, key=str(self), owner=self)
+
+    def show_records(self, records):
+        self.proj_rows.sync([(rec_id, str(rec_id), (str(name),), None) for rec_id, name in records])
 
+    @traced
     def save_record(self):
         project_name = self.proj_entry.get()
-        if self.record_id != None:
-            session = DBSession()
-            record = session.query(Project).filter(Project.id == self.record_id).first()
-            record.name = project_name
-            session.commit()
-            session.close()
-            self.record_id = None
-        else:
-            if project_name != '':
-                session = DBSession()
-                new_record = Project(name=project_name)
-                session.add(new_record)
-                session.commit()
-                session.close()
+        try:
+            with session_scope() as session:
+                if self.record_id != None:
+                    record = session.query(Project).filter(Project.id == self.record_id).first()
+                    record.name = project_name
+                else:
+                    if project_name != '':
+                        new_record = Project(name=project_name)
+                        session.add(new_record)
+        except IntegrityError:
+            # Names are unique, the database refused a duplicate.
+            mb.showwarning('Duplicate', f'{project_name} already exists.', parent=self)
+            return
+        self.record_id = None
         self.update_view()
         self.proj_entry.delete(0, tk.END)
         self.proj_entry.focus_set()
 
+    @traced
     def search_record(self):
         keyword = self.proj_entry.get()
         if keyword == 'all':
             self.update_view()
             return
         if keyword != '':
-            children = self.proj_view.get_children()
-            if len(children) != 0:
-                for child in children:
-                    self.proj_view.delete(child)
-            session = DBSession()
-            records = session.query(Project).filter(Project.name.like(f'%{keyword}%')).all()
-            if len(records) != 0:
-                counter = 1
-                for record in records:
-                    if counter % 2 == 0:
-                        self.proj_view.insert('', tk.END, str(record.id), text=str(record.id), tags='even')
-                    else:
-                        self.proj_view.insert('', tk.END, str(record.id), text=str(record.id), tags='odd')
-                    self.proj_view.set(str(record.id), 'project', str(record.name))
-                    counter+=1
-            else:
-                self.update_view()
-                mb.showwarning('No Records Found', 'Sorry no record(s) has been found', parent=self)
+            get_executor(self).submit(search_names, Project, keyword, callback=self.show_found, key=str(self), owner=self)
+
+    def show_found(self, records):
+        if len(records) != 0:
+            self.show_records(records)
+        else:
+            self.update_view()
+            mb.showwarning('No Records Found', 'Sorry no record(s) has been found', parent=self)
 
     def edit_record(self):
         record = self.proj_view.focus()
@@ -605,53 +943,39 @@ class ProjectWindow(tk.Frame):
         else:
             mb.showwarning('No Record', 'Please select a record and try again.', parent=self)
 
+    @traced
     def delete_record(self):
         '''This method delete the highlighted record from the database.'''
         record = self.proj_view.focus()
         if record != '':
             # Checks if a record has been selected
             record_id = int(record)
-            session = DBSession()
-            # Query the record from database.
-            record = session.query(Project).filter(Project.id == record_id).first()
-            # This line delete the record.
-            session.delete(record)
-            # Applied all the pending transaction to the database.
-            session.commit()
-            # Explicitly close database connection.
-            session.close()
+            # The session commits and closes at the end of the block.
+            with session_scope() as session:
+                # Query the record from database.
+                record = session.query(Project).filter(Project.id == record_id).first()
+                # This line delete the record.
+                session.delete(record)
             # Reload the projects view and display it.
             self.update_view()
         else:
             # Trow a messagebox if no record is selected.
             mb.showwarning('No Record', 'Please select a record and try again.', parent=self)
 
+    @traced
     def export_record(self):
         '''This method is use to export project table to excel file.'''
         # Ask the location to save the file.
-        filename = fd.asksaveasfilename(parent=self, defaultextension='.xls', initialfile='project_details.xls')
+        filename = fd.asksaveasfilename(parent=self, defaultextension='.xlsx', initialfile='project_details.xlsx')
         # Checks if a location has been selected, if not will skip the code below.
         if filename != '':
-            # This create a temporary workbook and worksheet
-            wb = Workbook()
-            ws = wb.active
-
-            session = DBSession()
-            # Gets the details of project table
-            records = session.query(Project).all()
-            # If table is not empty begin writing it into excel worksheet.
-            if len(records) != 0:
-                ws['A1'] = 'ID'
-                ws['B1'] = 'Project'
-                counter = 2
-                for record in records:
-                    ws[f'A{counter}'] = str(record.id)
-                    ws[f'B{counter}'] = str(record.name)
-                    counter+=1
-            # This will save the workbook from memory into a file.
-            wb.save(filename)
-            # Then finally closes the connection to the database.
-            session.close()
+            from reports import write_xlsx
+            # The connection to the database is closed after the block.
+            with session_scope() as session:
+                # Stream the table into the workbook instead of loading it whole.
+                records = session.query(Project.id, Project.name).order_by(Project.id).yield_per(500)
+                rows = ((str(rec_id), str(name)) for rec_id, name in records)
+                write_xlsx(filename, [('Project', ('ID', 'Project'), rows)])
 
     def close_app(self):
         self.master.destroy()
@@ -697,6 +1021,7 @@ class DesignationWindow(tk.Frame):
         self.proj_view = ttk.Treeview(mid_frame)
         self.proj_view.pack(expand=True, fill=tk.BOTH, side=tk.LEFT)
         self.proj_view['columns'] = ('designation',)
+        self.proj_rows = KeyedTree(self.proj_view)
         self.proj_view.heading('#0', text='ID')
         self.proj_view.column('#0', width=50, stretch=False)
         self.proj_view.heading('designation', text='DESIGNATION')
@@ -727,68 +1052,49 @@ class DesignationWindow(tk.Frame):
 
         self.proj_entry.focus_set()
 
+    @traced
     def update_view(self):
-        session = DBSession()
-        records = session.query(Designation).all()
-        children = self.proj_view.get_children()
-        if len(children) != 0:
-            for child in children:
-                self.proj_view.delete(child)
-        if not len(records) == 0:
-            counter = 1
-            for record in records:
-                if counter % 2 == 0:
-                    self.proj_view.insert('', tk.END, str(record.id), text=str(record.id), tags='even')
-                else:
-                    self.proj_view.insert('', tk.END, str(record.id), text=str(record.id), tags='odd')
-                self.proj_view.set(str(record.id), 'designation', str(record.name))
-                counter+=1
-        session.close()
+        get_executor(self).submit(list_names, Designation, callback=self.show_records, key=str(self), owner=self)
+
+    def show_records(self, records):
+        self.proj_rows.sync([(rec_id, str(rec_id), (str(name),), None) for rec_id, name in records])
 
+    @traced
     def save_record(self):
         project_name = self.proj_entry.get()
-        if self.record_id != None:
-            session = DBSession()
-            record = session.query(Designation).filter(Designation.id == self.record_id).first()
-            record.name = project_name
-            session.commit()
-            session.close()
-            self.record_id = None
-        else:
-            if project_name != '':
-                session = DBSession()
-                new_record = Designation(name=project_name)
-                session.add(new_record)
-                session.commit()
-                session.close()
+        try:
+            with session_scope() as session:
+                if self.record_id != None:
+                    record = session.query(Designation).filter(Designation.id == self.record_id).first()
+                    record.name = project_name
+                else:
+                    if project_name != '':
+                        new_record = Designation(name=project_name)
+                        session.add(new_record)
+        except IntegrityError:
+            # Names are unique, the database refused a duplicate.
+            mb.showwarning('Duplicate', f'{project_name} already exists.', parent=self)
+            return
+        self.record_id = None
         self.update_view()
         self.proj_entry.delete(0, tk.END)
         self.proj_entry.focus_set()
 
+    @traced
     def search_record(self):
         keyword = self.proj_entry.get()
         if keyword == 'all':
             self.update_view()
             return
         if keyword != '':
-            children = self.proj_view.get_children()
-            if len(children) != 0:
-                for child in children:
-                    self.proj_view.delete(child)
-            session = DBSession()
-            records = session.query(Designation).filter(Designation.name.like(f'%{keyword}%')).all()
-            if len(records) != 0:
-                counter = 1
-                for record in records:
-                    if counter % 2 == 0:
-                        self.proj_view.insert('', tk.END, str(record.id), text=str(record.id), tags='even')
-                    else:
-                        self.proj_view.insert('', tk.END, str(record.id), text=str(record.id), tags='odd')
-                    self.proj_view.set(str(record.id), 'project', str(record.name))
-                    counter+=1
-            else:
-                self.update_view()
-                mb.showwarning('No Records Found', 'Sorry no record(s) has been found', parent=self)
+            get_executor(self).submit(search_names, Designation, keyword, callback=self.show_found, key=str(self), owner=self)
+
+    def show_found(self, records):
+        if len(records) != 0:
+            self.show_records(records)
+        else:
+            self.update_view()
+            mb.showwarning('No Records Found', 'Sorry no record(s) has been found', parent=self)
 
     def edit_record(self):
         record = self.proj_view.focus()
@@ -801,58 +1107,286 @@ class DesignationWindow(tk.Frame):
         else:
             mb.showwarning('No Record', 'Please select a record and try again.', parent=self)
 
+    @traced
     def delete_record(self):
         '''This method delete the highlighted record from the database.'''
         record = self.proj_view.focus()
         if record != '':
             # Checks if a record has been selected
             record_id = int(record)
-            session = DBSession()
-            # Query the record from database.
-            record = session.query(Designation).filter(Designation.id == record_id).first()
-            # This line delete the record.
-            session.delete(record)
-            # Applied all the pending transaction to the database.
-            session.commit()
-            # Explicitly close database connection.
-            session.close()
+            # The session commits and closes at the end of the block.
+            with session_scope() as session:
+                # Query the record from database.
+                record = session.query(Designation).filter(Designation.id == record_id).first()
+                # This line delete the record.
+                session.delete(record)
             # Reload the projects view and display it.
             self.update_view()
         else:
             # Trow a messagebox if no record is selected.
             mb.showwarning('No Record', 'Please select a record and try again.', parent=self)
 
+    @traced
     def export_record(self):
         '''This method is use to export project table to excel file.'''
         # Ask the location to save the file.
-        filename = fd.asksaveasfilename(parent=self, defaultextension='.xls', initialfile='project_details.xls')
+        filename = fd.asksaveasfilename(parent=self, defaultextension='.xlsx', initialfile='designation_details.xlsx')
         # Checks if a location has been selected, if not will skip the code below.
         if filename != '':
-            # This create a temporary workbook and worksheet
-            wb = Workbook()
-            ws = wb.active
-
-            session = DBSession()
-            # Gets the details of project table
-            records = session.query(Designation).all()
-            # If table is not empty begin writing it into excel worksheet.
-            if len(records) != 0:
-                ws['A1'] = 'ID'
-                ws['B1'] = 'Designation'
-                counter = 2
-                for record in records:
-                    ws[f'A{counter}'] = str(record.id)
-                    ws[f'B{counter}'] = str(record.name)
-                    counter+=1
-            # This will save the workbook from memory into a file.
-            wb.save(filename)
-            # Then finally closes the connection to the database.
-            session.close()
+            from reports import write_xlsx
+            # The connection to the database is closed after the block.
+            with session_scope() as session:
+                # Stream the table into the workbook instead of loading it whole.
+                records = session.query(Designation.id, Designation.name).order_by(Designation.id).yield_per(500)
+                rows = ((str(rec_id), str(name)) for rec_id, name in records)
+                write_xlsx(filename, [('Designation', ('ID', 'Designation'), rows)])
 
     def close_app(self):
         self.master.destroy()
 # End of DesignationWindow class
 
+# Start of DashboardWindow class
+class DashboardWindow(tk.Frame):
+    """Charts of how the manpower is split between the projects and how
+    each designation moved lately, drawn straight on canvases."""
+    COLORS = ('#569FA9', '#FF2100', '#1C1C7B')
+    def __init__(self, master=None, *args, **kwargs):
+        super(DashboardWindow, self).__init__(master, *args, **kwargs)
+        self.master.protocol('WM_DELETE_WINDOW', self.close_app)
+        self.master.title('Dashboard')
+        self.master.geometry('1000x650')
+        self.img_list = image_list()
+        self.img36_list = image_list(size=(36, 36))
+        if os.name == "nt":
+            self.master.iconbitmap('manpower.ico')
+        elif os.name == 'posix':
+            self.master.tk.call('wm', 'iconphoto', self.master._w, self.img36_list['manpower'])
+        self.executor = get_executor(self)
+        self.data = None
+        self.setup_ui()
+        self.update_view()
+
+    def setup_ui(self):
+        top_frame = ttk.Frame(self)
+        top_frame.pack(fill=tk.X, padx=5, pady=5)
+        chart_frame = ttk.Frame(self)
+        chart_frame.pack(fill=tk.BOTH, expand=True)
+        trend_frame = ttk.Labelframe(self, text='Present per day')
+        trend_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        bot_frame = ttk.Frame(self)
+        bot_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        date_lbl = ttk.Label(top_frame, text='Up to:')
+        date_lbl.pack(side=tk.LEFT)
+        self.date_entry = ttk.Entry(top_frame, width=15)
+        self.date_entry.pack(side=tk.LEFT, padx=5)
+        self.date_entry.insert(tk.END, datetime.strftime(datetime.now(), '%d/%m/%Y'))
+        date_btn = ttk.Button(top_frame, image=self.img_list['calendar'], command=self.change_date)
+        date_btn.pack(side=tk.LEFT)
+        show_btn = ttk.Button(top_frame, text='Show', image=self.img_list['search'], compound=tk.LEFT, command=self.update_view)
+        show_btn.pack(side=tk.LEFT, padx=10)
+
+        proj_frame = ttk.Labelframe(chart_frame, text='Manpower per project, last 30 days')
+        proj_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.proj_canvas = tk.Canvas(proj_frame, background='white', height=250)
+        self.proj_canvas.pack(fill=tk.BOTH, expand=True)
+        ratio_frame = ttk.Labelframe(chart_frame, text='Present / Absent / Vacation, last 30 days')
+        ratio_frame.pack(side=tk.LEFT, fill=tk.BOTH, padx=5, pady=5)
+        self.ratio_canvas = tk.Canvas(ratio_frame, background='white', width=300, height=250)
+        self.ratio_canvas.pack(fill=tk.BOTH, expand=True)
+
+        option_frame = ttk.Frame(trend_frame)
+        option_frame.pack(fill=tk.X)
+        self.desg_var = tk.StringVar()
+        self.desg_cb = ttk.Combobox(option_frame, textvariable=self.desg_var, state='readonly', width=30)
+        self.desg_cb.pack(side=tk.LEFT, padx=5, pady=5)
+        self.desg_cb.bind('<<ComboboxSelected>>', lambda event: self.draw_trend())
+        self.days_var = tk.IntVar(value=30)
+        for days in (30, 90):
+            days_rb = ttk.Radiobutton(option_frame, text=f'{days} days', variable=self.days_var, value=days, command=self.draw_trend)
+            days_rb.pack(side=tk.LEFT, padx=5)
+        self.trend_canvas = tk.Canvas(trend_frame, background='white', height=220)
+        self.trend_canvas.pack(fill=tk.BOTH, expand=True)
+
+        # Charts are drawn again to fit when the window is resized.
+        for canvas in (self.proj_canvas, self.ratio_canvas, self.trend_canvas):
+            canvas.bind('<Configure>', lambda event: self.draw_charts())
+
+        close_btn = ttk.Button(bot_frame, text='Close', image=self.img_list['cancel'], compound=tk.LEFT, command=self.close_app)
+        close_btn.pack(side=tk.RIGHT)
+
+    def change_date(self):
+        date_now = datetime.today()
+        tp = tk.Toplevel(self)
+        win = CalendarWidget(date_now.year, date_now.month, tp)
+        win.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+        self.wait_window(tp)
+        if win.date is not None:
+            self.date_entry.delete('0', tk.END)
+            self.date_entry.insert(tk.END, win.date)
+            self.update_view()
+
+    @traced
+    def update_view(self):
+        try:
+            date_to = datetime.strptime(self.date_entry.get(), '%d/%m/%Y')
+        except ValueError:
+            mb.showwarning('Invalid Date', 'Please enter the date as dd/mm/yyyy.', parent=self)
+            return
+        self.executor.submit(dashboard_data, date_to, callback=self.show_data, key=str(self), owner=self)
+
+    def show_data(self, data):
+        self.data = data
+        # Busiest designations first.
+        names = sorted(data.trends, key=lambda name: -sum(data.trends[name]))
+        self.desg_cb.config(values=names)
+        if self.desg_var.get() not in data.trends:
+            self.desg_var.set(names[0] if len(names) != 0 else '')
+        self.draw_charts()
+
+    def draw_charts(self):
+        if self.data is None:
+            return
+        self.draw_projects()
+        self.draw_ratio()
+        self.draw_trend()
+
+    def draw_projects(self):
+        """Stacked bar per project, the label gives the present rate."""
+        canvas = self.proj_canvas
+        canvas.delete(tk.ALL)
+        projects = self.data.projects
+        if len(projects) == 0:
+            canvas.create_text(10, 10, text='No manpower entered.', anchor=tk.NW)
+            return
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        label_width = 150
+        bar_space = (height - 10) / len(projects)
+        largest = max(share.present + share.absent + share.vacation for share in projects) or 1
+        scale = (width - label_width - 70) / largest
+        for index, share in enumerate(projects):
+            top = 5 + index * bar_space
+            bottom = top + max(bar_space * 0.7, 1)
+            canvas.create_text(label_width - 5, (top + bottom) / 2, text=share.project, anchor=tk.E)
+            left = label_width
+            for amount, color in zip((share.present, share.absent, share.vacation), self.COLORS):
+                right = left + amount * scale
+                if amount != 0:
+                    canvas.create_rectangle(left, top, right, bottom, fill=color, outline='')
+                left = right
+            total = share.present + share.absent + share.vacation
+            rate = share.present * 100 / total if total else 0
+            canvas.create_text(left + 5, (top + bottom) / 2, text=f'{rate:.0f}%', anchor=tk.W)
+
+    def draw_ratio(self):
+        canvas = self.ratio_canvas
+        canvas.delete(tk.ALL)
+        total = sum(self.data.totals)
+        if total == 0:
+            return
+        size = min(canvas.winfo_width(), canvas.winfo_height() - 70)
+        left = (canvas.winfo_width() - size) / 2
+        start = 90
+        for amount, color in zip(self.data.totals, self.COLORS):
+            extent = amount * 360 / total
+            if amount == total:
+                canvas.create_oval(left, 5, left + size, 5 + size, fill=color, outline='')
+            elif amount != 0:
+                canvas.create_arc(left, 5, left + size, 5 + size, start=start, extent=-extent, fill=color, outline='')
+            start -= extent
+        for index, (label, amount, color) in enumerate(zip(('Present', 'Absent', 'Vacation'), self.data.totals, self.COLORS)):
+            y = size + 20 + index * 18
+            canvas.create_rectangle(10, y - 6, 22, y + 6, fill=color, outline='')
+            canvas.create_text(30, y, text=f'{label}: {amount} ({amount * 100 / total:.1f}%)', anchor=tk.W)
+
+    def draw_trend(self):
+        canvas = self.trend_canvas
+        canvas.delete(tk.ALL)
+        if self.data is None or self.desg_var.get() not in self.data.trends:
+            return
+        days = self.days_var.get()
+        values = self.data.trends[self.desg_var.get()][-days:]
+        dates = self.data.dates[-days:]
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        left, right, top, bottom = 40, width - 10, 10, height - 25
+        largest = max(values) or 1
+        step = (right - left) / max(len(values) - 1, 1)
+        points = []
+        for index, value in enumerate(values):
+            points.append(left + index * step)
+            points.append(bottom - value * (bottom - top) / largest)
+        canvas.create_line(left, bottom, right, bottom)
+        canvas.create_line(left, top, left, bottom)
+        canvas.create_text(left - 5, top, text=f'{largest}', anchor=tk.E)
+        canvas.create_text(left - 5, bottom, text='0', anchor=tk.E)
+        canvas.create_text(left, bottom + 5, text=dates[0].strftime('%d/%m'), anchor=tk.N)
+        canvas.create_text(right, bottom + 5, text=dates[-1].strftime('%d/%m'), anchor=tk.NE)
+        canvas.create_line(*points, fill=self.COLORS[0], width=2)
+
+    def close_app(self):
+        self.master.destroy()
+# End of DashboardWindow class
+
+# Start of ProfileWindow class
+class ProfileWindow(tk.Frame):
+    """Lists the latest user actions with their query counts and times,
+    refreshed every second while it is open."""
+    REFRESH_MS = 1000
+    def __init__(self, master=None, *args, **kwargs):
+        super(ProfileWindow, self).__init__(master, *args, **kwargs)
+        self.master.protocol('WM_DELETE_WINDOW', self.close_app)
+        self.master.title('Query Profile')
+        self.master.geometry('900x400')
+        self.img_list = image_list()
+        self.setup_ui()
+        self.update_view()
+
+    def setup_ui(self):
+        info_lbl = ttk.Label(self, text=f'Slow statements and possible N+1 queries are written to {PROFILE_LOG}')
+        info_lbl.pack(fill=tk.X, padx=5, pady=5)
+        view_frame = ttk.Frame(self)
+        view_frame.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+        bot_frame = ttk.Frame(self)
+        bot_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        cols = ('action', 'queries', 'database', 'wall', 'repeated')
+        self.action_view = ttk.Treeview(view_frame, columns=cols)
+        self.action_view.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        self.action_rows = KeyedTree(self.action_view)
+        self.action_view.heading('#0', text='TIME')
+        self.action_view.column('#0', width=80, stretch=False)
+        for col, text in zip(cols, ('ACTION', 'QUERIES', 'DB MS', 'WALL MS', 'N+1')):
+            self.action_view.heading(col, text=text)
+            if col != 'action':
+                self.action_view.column(col, width=80, stretch=False, anchor=tk.CENTER)
+        self.action_view.tag_configure("odd", background="#d5f4e6")
+        self.action_view.tag_configure("even", background="#80ced6")
+        self.action_view.tag_configure("warning", background="#FF2100", foreground='white')
+
+        vbar = ttk.Scrollbar(view_frame, orient=tk.VERTICAL, command=self.action_view.yview)
+        vbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.action_view['yscrollcommand'] = vbar.set
+
+        close_btn = ttk.Button(bot_frame, text='Close', image=self.img_list['cancel'], compound=tk.LEFT, command=self.close_app)
+        close_btn.pack(side=tk.RIGHT)
+
+    def update_view(self):
+        items = []
+        for stats in instrument.recent_actions():
+            values = (stats.name, stats.queries, f'{stats.db_seconds*1000:.1f}',
+                      f'{stats.wall_seconds*1000:.1f}', len(stats.repeated) or '')
+            tag = 'warning' if len(stats.repeated) != 0 else None
+            items.append((id(stats), time.strftime('%H:%M:%S', time.localtime(stats.started)), values, tag))
+        self.action_rows.sync(items)
+        self.after_job = self.after(self.REFRESH_MS, self.update_view)
+
+    def close_app(self):
+        self.after_cancel(self.after_job)
+        self.master.destroy()
+# End of ProfileWindow class
+
 # Start of AboutWindow class
 class AboutWindow(tk.Frame):
     def __init__(self, master=None, *args, **kwargs):
@@ -923,12 +1457,18 @@ class AboutWindow(tk.Frame):
 
 # Start of TransactionWindow class
 class TransactionWindow(tk.Frame):
+    # Number of rows fetched each time the user scrolls near the end.
+    PAGE_SIZE = 200
+    # Milliseconds to wait after the last key press before searching.
+    SEARCH_DELAY = 250
+
     def __init__(self, master=None, *args, **kwargs):
         super(TransactionWindow, self).__init__(master, *args, **kwargs)
         self.master.protocol('WM_DELETE_WINDOW', self.close_app)
         # self.master.geometry('600x400+20+20')
         self.master.title('Transaction')
         self.record_id = None
+        self.search_job = None
         self.img_list = image_list()
         self.img36_list = image_list(size=(36, 36))
         if os.name == "nt":
@@ -946,15 +1486,33 @@ class TransactionWindow(tk.Frame):
         bot_frame = ttk.Frame(self)
         bot_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        proj_name = ttk.Label(top_frame, text='Project Name:')
+        proj_name = ttk.Label(top_frame, text='Project / Remarks:')
         proj_name.pack(side=tk.LEFT, padx=5, pady=5)
         self.proj_entry = ttk.Entry(top_frame, font=('Cambria', 10, 'bold'))
         self.proj_entry.pack(side=tk.LEFT, padx=5, pady=5)
+        self.proj_entry.bind('<KeyRelease>', self.on_search_key)
+        self.proj_entry.bind('<Return>', lambda event: self.search_record())
         self.search_btn = ttk.Button(top_frame, text='Search', image=self.img_list['search'], compound=tk.LEFT)
         self.search_btn.pack(side=tk.LEFT, padx=5, pady=5)
+        self.search_btn.config(command=self.search_record)
+
+        # Only the transactions inside this date range are fetched.
+        from_lbl = ttk.Label(top_frame, text='From:')
+        from_lbl.pack(side=tk.LEFT, padx=5, pady=5)
+        self.from_entry = ttk.Entry(top_frame, width=12)
+        self.from_entry.pack(side=tk.LEFT, padx=5, pady=5)
+        self.from_entry.insert(tk.END, datetime.strftime(datetime.now().replace(day=1), '%d/%m/%Y'))
+        to_lbl = ttk.Label(top_frame, text='To:')
+        to_lbl.pack(side=tk.LEFT, padx=5, pady=5)
+        self.to_entry = ttk.Entry(top_frame, width=12)
+        self.to_entry.pack(side=tk.LEFT, padx=5, pady=5)
+        self.filter_btn = ttk.Button(top_frame, text='Filter', image=self.img_list['calendar'], compound=tk.LEFT)
+        self.filter_btn.pack(side=tk.LEFT, padx=5, pady=5)
+        self.filter_btn.config(command=self.update_view)
 
         self.manp_view = ttk.Treeview(mid_frame)
         self.manp_view.pack(expand=True, fill=tk.BOTH, side=tk.LEFT)
+        self.manp_rows = KeyedTree(self.manp_view)
         self.manp_view['columns'] = ('date', 'project', 'present',
                                     'absent', 'vacation', 'total', 'remarks')
         self.manp_view.heading('#0', text='ID')
@@ -980,7 +1538,7 @@ class TransactionWindow(tk.Frame):
         self.vbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         self.vbar.config(command=self.manp_view.yview)
-        self.manp_view['yscrollcommand'] = self.vbar.set
+        self.manp_view['yscrollcommand'] = self.on_scroll
 
         self.new_btn = ttk.Button(bot_frame, text='New', image=self.img_list['plus'], compound=tk.LEFT)
         self.new_btn.pack(side=tk.LEFT, padx=5, pady=5)
@@ -1001,25 +1559,62 @@ class TransactionWindow(tk.Frame):
         self.update_view()
         self.proj_entry.focus_set()
 
+    def date_filter(self, entry):
+        value = entry.get().strip()
+        if value == '':
+            return None
+        try:
+            return datetime.strptime(value, '%d/%m/%Y')
+        except ValueError:
+            mb.showwarning('Invalid Date', f'{value} is not a dd/mm/yyyy date.', parent=self)
+            return None
+
     def update_view(self):
-        session = DBSession()
-        records = session.query(TransactionDetails).join(Transaction).all()
-        children = self.manp_view.get_children()
-        if len(children) != 0:
-            for child in children:
-                self.manp_view.delete(child)
-        if not len(records) == 0:
-            counter = 1
-            for record in records:
-                tr_date = datetime.strftime(record.transaction.tr_date, '%d/%m/%Y')
-                total = record.present + record.absent + record.vacation
-                values = (tr_date, record.transaction.project.name, record.present, record.absent, record.vacation, f"{total}", record.transaction.remarks)
-                if counter % 2 == 0:
-                    self.manp_view.insert('', tk.END, str(record.id), text=str(record.id), tags='even', values=values)
-                else:
-                    self.manp_view.insert('', tk.END, str(record.id), text=str(record.id), tags='odd', values=values)
-                counter+=1
-        session.close()
+        """Clear the grid and load the first page of the date range."""
+        self.manp_rows.clear()
+        self.date_from = self.date_filter(self.from_entry)
+        self.date_to = self.date_filter(self.to_entry)
+        self.last_key = None
+        self.exhausted = False
+        self.page_pending = False
+        self.load_page()
+
+    @traced
+    def load_page(self):
+        """Fetch the next page of rows on a worker thread. Only one page
+        is requested at a time, and resetting the view drops it."""
+        if self.exhausted or self.page_pending:
+            return
+        self.page_pending = True
+        get_executor(self).submit(history_page, self.last_key, self.PAGE_SIZE, self.date_from, self.date_to,
+                                  callback=self.show_page, errback=self.page_failed, key=str(self), owner=self)
+
+    def page_failed(self, error):
+        """Report a page that could not be read. The next scroll asks
+        for it again."""
+        self.page_pending = False
+        mb.showerror('Loading Failed', str(error), parent=self)
+
+    def show_page(self, rows):
+        """Append a page of rows to the grid."""
+        self.page_pending = False
+        if len(rows) < self.PAGE_SIZE:
+            self.exhausted = True
+        items = []
+        for row in rows:
+            tr_date = datetime.strftime(row.tr_date, '%d/%m/%Y')
+            total = row.present + row.absent + row.vacation
+            values = (tr_date, row.project, row.present, row.absent, row.vacation, f"{total}", row.remarks)
+            items.append((row.id, str(row.id), values, None))
+        self.manp_rows.append(items)
+        if len(rows) != 0:
+            self.last_key = page_key(rows[-1])
+
+    def on_scroll(self, first, last):
+        """Keep the scrollbar in sync and fetch more rows near the end."""
+        self.vbar.set(first, last)
+        if float(last) > 0.9:
+            self.load_page()
 
     def new_record(self):
         tp = tk.Toplevel(self)
@@ -1044,8 +1639,36 @@ class TransactionWindow(tk.Frame):
     def delete_record(self):
         pass
 
+    def on_search_key(self, event):
+        """Search once the user stops typing instead of on every key."""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DELAY, self.search_record)
+
+    @traced
     def search_record(self):
-        pass
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+            self.search_job = None
+        keyword = self.proj_entry.get().strip()
+        if keyword == '':
+            self.update_view()
+            return
+        # The results replace the pages, a page still loading is dropped.
+        self.exhausted = True
+        self.page_pending = False
+        get_executor(self).submit(search_transactions, keyword, self.PAGE_SIZE,
+                                  callback=self.show_found, key=str(self), owner=self)
+
+    def show_found(self, hits):
+        """Show one row per transaction found, with its totals."""
+        items = []
+        for hit in hits:
+            tr_date = datetime.strftime(hit.tr_date, '%d/%m/%Y')
+            total = hit.present + hit.absent + hit.vacation
+            values = (tr_date, hit.project, hit.present, hit.absent, hit.vacation, f"{total}", hit.remarks or "")
+            items.append((f't{hit.id}', str(hit.id), values, None))
+        self.manp_rows.sync(items)
 
     def export_record(self):
         pass
@@ -1068,7 +1691,12 @@ class AddManpowerWindow(tk.Frame):
         elif os.name == 'posix':
             self.master.tk.call('wm', 'iconphoto', self.master._w, self.img36_list['manpower'])
         self.trans_id = None
+        # Date and project id of the saved transaction, for the rollup.
+        self.trans_date = None
+        self.project_id = None
         self.details_id = None
+        # One session is reused by the whole window and closed with it.
+        self.session = DBSession()
         self.setup_ui()
 
     def setup_ui(self):
@@ -1089,12 +1717,7 @@ class AddManpowerWindow(tk.Frame):
         date_btn.config(command=self.change_date)
 
         self.proj_var = tk.StringVar()
-        values = []
-        session = DBSession()
-        records = session.query(Project.name).all()
-        for record in records:
-            values.append(record[0])
-        session.close()
+        values = PROJECTS.names(self.session)
         self.proj_var.set(values[0])
 
         proj_lbl = ttk.Label(top_frame, text='Project:')
@@ -1115,13 +1738,10 @@ class AddManpowerWindow(tk.Frame):
         view_detail_frame.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
 
         self.desg_var = tk.StringVar()
-        values = []
-        session = DBSession()
-        records = session.query(Designation.name).all()
-        for record in records:
-            values.append(record[0])
+        # Designation ids by name, from the process-wide name cache.
+        self.desg_ids = DESIGNATIONS.ids(self.session)
+        values = list(self.desg_ids)
         self.desg_var.set(values[0])
-        session.close()
 
         self.desg_cb = ttk.Combobox(add_detail_frame, textvariable=self.desg_var, values=values, width=30)
         self.desg_cb.grid(row=1, column=0)
@@ -1147,10 +1767,14 @@ class AddManpowerWindow(tk.Frame):
         details_btn = ttk.Button(add_detail_frame, text='Add Entry', image=self.img_list['save'], compound=tk.LEFT, command=self.save_details)
         details_btn.grid(row=1, column=4)
 
+        bulk_btn = ttk.Button(add_detail_frame, text='Bulk Entry', image=self.img_list['edit'], compound=tk.LEFT, command=self.bulk_entry)
+        bulk_btn.grid(row=1, column=5)
+
         cols = ('designation', 'present', 'absent', 'vacation', 'total')
 
         self.details_view = ttk.Treeview(view_detail_frame)
         self.details_view.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        self.details_rows = KeyedTree(self.details_view)
 
         self.details_view['columns'] = cols
         self.details_view.column('#0', width=65, stretch=False)
@@ -1190,79 +1814,83 @@ class AddManpowerWindow(tk.Frame):
 
         self.date_entry.focus_set()
 
+    @traced
     def delete_record(self):
         details_id = self.details_view.focus()
         if details_id != '':
             details_id = int(details_id)
-            session = DBSession()
-            record = session.query(TransactionDetails).filter(TransactionDetails.id == details_id).first()
-            session.delete(record)
-            session.commit()
-            session.close()
+            session = self.session
+            try:
+                record = session.query(TransactionDetails).filter(TransactionDetails.id == details_id).first()
+                rollup.apply_delta(session, self.trans_date, self.project_id, record.designation_id,
+                                   -record.present, -record.absent, -record.vacation)
+                session.delete(record)
+                session.commit()
+            except:
+                session.rollback()
+                raise
             self.update_view()
         else:
             mb.showwarning('No record', 'Please select a record and try again.')
 
+    @traced
     def save_trans(self):
         tr_date = datetime.strptime(self.date_entry.get(), '%d/%m/%Y')
         project_name = self.proj_var.get()
         remarks = self.remarks_entry.get()
-        session = DBSession()
-        project = session.query(Project).filter(Project.name == project_name).first()
-        new_record = Transaction(tr_date=tr_date, project=project, remarks=remarks)
-        session.add(new_record)
-        session.commit()
-        session.close()
-        self.trans_id = self.get_last_id()
+        session = self.session
+        project_id = PROJECTS.id_of(session, project_name)
+        if project_id is None:
+            mb.showwarning('Unknown project', f'{project_name} is not a project.', parent=self)
+            return
+        try:
+            new_record = Transaction(tr_date=tr_date, project_id=project_id, remarks=remarks)
+            session.add(new_record)
+            # The summary of the date lists the project and its remarks.
+            mark_changed(session, tr_date, tr_date)
+            session.flush()
+            # Read the id before committing, the last id of the table may
+            # belong to another user saving at the same time.
+            self.trans_id = new_record.id
+            session.commit()
+            self.trans_date = tr_date
+            self.project_id = project_id
+        except:
+            session.rollback()
+            raise
         self.trans_save.config(state=tk.DISABLED)
 
-    def get_last_id(self):
-        last_id = 0
-        session = DBSession()
-        record = session.query(Transaction).order_by(Transaction.id.desc()).first()
-        if record == None:
-            last_id = 1
-        else:
-            last_id = record.id
-        session.close()
-        return last_id
-
+    @traced
     def update_view(self):
         trans_id = self.trans_id
-        children = self.details_view.get_children()
-        self.details_view.delete(*children)
-        session = DBSession()
-        records = session.query(TransactionDetails).filter(TransactionDetails.transaction_id == trans_id).all()
+        records = self.session.query(TransactionDetails).filter(TransactionDetails.transaction_id == trans_id).all()
+        items = []
         sum_present = 0
         sum_absent = 0
         sum_vacation = 0
         grand_total = 0
-        counter = 1
         for record in records:
             sum_present+=record.present
             sum_absent+=record.absent
             sum_vacation+=record.vacation
-            values = (record.designation.name, f'{record.present}', f'{record.absent}', f'{record.vacation}', f'{record.present+record.absent+record.vacation}')
-            if counter % 2 == 0:
-                self.details_view.insert('', tk.END, f'{record.id}', text=f'{record.id}', values=values, tags='even')
-            else:
-                self.details_view.insert('', tk.END, f'{record.id}', text=f'{record.id}', values=values, tags='odd')
-            counter+=1
+            designation = DESIGNATIONS.name_of(self.session, record.designation_id)
+            values = (designation, f'{record.present}', f'{record.absent}', f'{record.vacation}', f'{record.present+record.absent+record.vacation}')
+            items.append((record.id, f'{record.id}', values, None))
         grand_total = sum_present + sum_absent + sum_vacation
         values = ('Total', f'{sum_present}', f'{sum_absent}', f'{sum_vacation}', f'{grand_total}')
-        self.details_view.insert('', tk.END, 'total' , text='', values=values, tags='total_design')
+        items.append(('total', '', values, 'total_design'))
+        self.details_rows.sync(items)
 
     def get_details_id(self):
         last_id = 0
-        session = DBSession()
-        record = session.query(TransactionDetails).order_by(TransactionDetails.id.desc()).first()
+        record = self.session.query(TransactionDetails).order_by(TransactionDetails.id.desc()).first()
         if record == None:
             last_id = 1
         else:
             last_id = record.id
-        session.close()
         return last_id
 
+    @traced
     def save_details(self):
         if self.trans_id == None:
             mb.showwarning('Not save', 'Please save the transaction \nbefore adding details!')
@@ -1272,27 +1900,33 @@ class AddManpowerWindow(tk.Frame):
         present = int(self.present_entry.get())
         absent = int(self.absent_entry.get())
         vacation = int(self.vacation_entry.get())
-        session = DBSession()
-
-        if self.details_id != None:
-            desg_rec = session.query(Designation).filter(Designation.name == desg_var).first()
-            transdetails_rec = session.query(TransactionDetails).filter(TransactionDetails.id == self.details_id).first()
-            transdetails_rec.designation = desg_rec
-            transdetails_rec.present = present
-            transdetails_rec.absent = absent
-            transdetails_rec.vacation = vacation
-            session.commit()
-            session.close()
-            self.details_id = None
-            self.update_view()
-        else:
-            trans_rec = session.query(Transaction).filter(Transaction.id == self.trans_id).first()
-            desg_rec = session.query(Designation).filter(Designation.name == desg_var).first()
-            new_record = TransactionDetails(transaction=trans_rec, designation=desg_rec, present=present, absent=absent, vacation=vacation)
-            session.add(new_record)
-            session.commit()
-            session.close()
-            self.update_view()
+        session = self.session
+        desg_id = self.desg_ids.get(desg_var)
+        if desg_id is None:
+            mb.showwarning('Unknown designation', f'{desg_var} is not a designation.', parent=self)
+            return
+
+        try:
+            if self.details_id != None:
+                transdetails_rec = session.query(TransactionDetails).filter(TransactionDetails.id == self.details_id).first()
+                rollup.apply_delta(session, self.trans_date, self.project_id, transdetails_rec.designation_id,
+                                   -transdetails_rec.present, -transdetails_rec.absent, -transdetails_rec.vacation)
+                transdetails_rec.designation_id = desg_id
+                transdetails_rec.present = present
+                transdetails_rec.absent = absent
+                transdetails_rec.vacation = vacation
+                rollup.apply_delta(session, self.trans_date, self.project_id, desg_id, present, absent, vacation)
+                session.commit()
+                self.details_id = None
+            else:
+                new_record = TransactionDetails(transaction_id=self.trans_id, designation_id=desg_id, present=present, absent=absent, vacation=vacation)
+                session.add(new_record)
+                rollup.apply_delta(session, self.trans_date, self.project_id, desg_id, present, absent, vacation)
+                session.commit()
+        except:
+            session.rollback()
+            raise
+        self.update_view()
 
         # Reset entry quantity to 0
         self.present_entry.delete('0', tk.END)
@@ -1303,6 +1937,16 @@ class AddManpowerWindow(tk.Frame):
         self.vacation_entry.insert(tk.END, '0')
         self.present_entry.focus_set()
 
+    def bulk_entry(self):
+        if self.trans_id == None:
+            mb.showwarning('Not save', 'Please save the transaction \nbefore adding details!')
+            return
+        tp = tk.Toplevel(self)
+        win = BulkEntryWindow(tp, session=self.session, trans_id=self.trans_id, desg_ids=self.desg_ids)
+        win.pack(expand=True, fill=tk.BOTH)
+        self.wait_window(tp)
+        self.update_view()
+
     def change_date(self):
         date_now = datetime.today()
         tp = tk.Toplevel(self)
@@ -1313,30 +1957,130 @@ class AddManpowerWindow(tk.Frame):
             self.date_entry.delete('0', tk.END)
             self.date_entry.insert(tk.END, win.date)
 
+    @traced
     def edit_record(self):
         details_id = self.details_view.focus()
         if details_id != '':
             details_id = int(details_id)
-            session = DBSession()
-            record = session.query(TransactionDetails).filter(TransactionDetails.id == details_id).first()
-            self.desg_var.set(record.designation.name)
+            record = self.session.query(TransactionDetails).filter(TransactionDetails.id == details_id).first()
+            self.desg_var.set(DESIGNATIONS.name_of(self.session, record.designation_id))
             self.present_entry.delete('0', tk.END)
             self.absent_entry.delete('0', tk.END)
             self.vacation_entry.delete('0', tk.END)
             self.present_entry.insert(tk.END, f"{record.present}")
             self.absent_entry.insert(tk.END, f"{record.absent}")
             self.vacation_entry.insert(tk.END, f"{record.vacation}")
-            session.close()
             self.details_id = details_id
         else:
             mb.showwarning('No record', 'Please select a record and try again.')
 
     def close_app(self):
+        self.session.close()
         self.master.destroy()
 # End of AddManpowerWindow class
 
+# Start of BulkEntryWindow class
+class BulkEntryWindow(tk.Frame):
+    """Grid with one present/absent/vacation row per designation.
+
+    Every filled row is saved at once with a single insert and commit
+    instead of one commit per designation.
+    """
+    def __init__(self, master=None, session=None, trans_id=None, desg_ids=None, *args, **kwargs):
+        super(BulkEntryWindow, self).__init__(master, *args, **kwargs)
+        self.master.protocol('WM_DELETE_WINDOW', self.close_app)
+        self.master.title('Bulk Entry')
+        self.master.geometry('520x600')
+        self.img_list = image_list()
+        self.session = session
+        self.trans_id = trans_id
+        self.desg_ids = desg_ids
+        # (designation name, present, absent, vacation entries) per row.
+        self.rows = []
+        self.setup_ui()
+
+    def setup_ui(self):
+        grid_frame = ttk.Frame(self)
+        grid_frame.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+        bot_frame = ttk.Frame(self)
+        bot_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        canvas = tk.Canvas(grid_frame, highlightthickness=0)
+        canvas.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        vbar = ttk.Scrollbar(grid_frame, orient=tk.VERTICAL, command=canvas.yview)
+        vbar.pack(side=tk.RIGHT, fill=tk.Y)
+        canvas['yscrollcommand'] = vbar.set
+
+        entry_frame = ttk.Frame(canvas)
+        canvas.create_window(0, 0, window=entry_frame, anchor=tk.NW)
+        entry_frame.bind('<Configure>', lambda event: canvas.config(scrollregion=canvas.bbox(tk.ALL)))
+
+        for column, text in enumerate(('Designation', 'Present', 'Absent', 'Vacation')):
+            lbl = ttk.Label(entry_frame, text=text)
+            lbl.grid(row=0, column=column, padx=5, pady=2)
+
+        for row, name in enumerate(self.desg_ids, 1):
+            lbl = ttk.Label(entry_frame, text=name)
+            lbl.grid(row=row, column=0, sticky=tk.W, padx=5)
+            entries = []
+            for column in range(1, 4):
+                entry = ttk.Entry(entry_frame, width=10, justify=tk.CENTER)
+                entry.grid(row=row, column=column, padx=2, pady=1)
+                entry.insert(tk.END, '0')
+                entries.append(entry)
+            self.rows.append((name, *entries))
+
+        save_btn = ttk.Button(bot_frame, text='Save All', image=self.img_list['save'], compound=tk.LEFT, command=self.save_records)
+        save_btn.pack(side=tk.LEFT)
+
+        close_btn = ttk.Button(bot_frame, text='Close', image=self.img_list['cancel'], compound=tk.LEFT, command=self.close_app)
+        close_btn.pack(side=tk.RIGHT)
+
+        if len(self.rows) != 0:
+            self.rows[0][1].focus_set()
+
+    @traced
+    def save_records(self):
+        records = []
+        for name, present_entry, absent_entry, vacation_entry in self.rows:
+            try:
+                present = int(present_entry.get() or 0)
+                absent = int(absent_entry.get() or 0)
+                vacation = int(vacation_entry.get() or 0)
+            except ValueError:
+                mb.showwarning('Invalid', f'Please enter whole numbers for {name}.')
+                present_entry.focus_set()
+                return
+            records.append((self.desg_ids[name], present, absent, vacation))
+
+        session = self.session
+        try:
+            count = bulk.insert_details(session, self.trans_id, records)
+            session.commit()
+        except:
+            session.rollback()
+            raise
+        if count == 0:
+            mb.showwarning('Nothing to save', 'Please enter the manpower of at least one designation.')
+            return
+        self.close_app()
+
+    def close_app(self):
+        self.master.destroy()
+# End of BulkEntryWindow class
+
 # Start of CalendarWidget class
 class CalendarWidget(tk.Frame):
+    DAY_NAMES = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+    MONTH_NAMES = ["January", "February", "March",
+                   "April", "May", "June",
+                   "July", "August", "September",
+                   "October", "November", "December"]
+    # Days with fewer projects than the busiest day of the month, and the
+    # range of colors of the days with all of them, lighter for less
+    # manpower.
+    PARTIAL_COLOR = "#f9d56e"
+    COMPLETE_COLORS = ("#d5f4e6", "#3c9d6b")
 
     def __init__(self, year, month, master=None, **kws):
         super(CalendarWidget, self).__init__(master, **kws)
@@ -1376,54 +2120,86 @@ class CalendarWidget(tk.Frame):
         self.days_frame = tk.Frame(self)
         self.days_frame.pack(expand=True, fill=tk.BOTH)
 
+        # The grid is made once and only its texts and colors change
+        # with the month.
+        for column, day in enumerate(self.DAY_NAMES):
+            day_lbl = tk.Label(self.days_frame, text=day, relief=tk.RAISED,
+                               font="Times 12 bold")
+            day_lbl.grid(row=0, column=column, sticky="nesw")
+            if (day == "Sun") or (day == "Sat"):
+                day_lbl.config(fg="red")
+        self.day_btns = []
+        for row in range(6):
+            for column in range(7):
+                day_btn = tk.Button(self.days_frame, width=3, font="Times 12 normal",
+                                    bg="white", relief=tk.RAISED)
+                day_btn.grid(row=row+1, column=column, sticky="nesw")
+                day_btn.bind("<Button-1>", self.printEvent)
+                day_btn.bind("<Enter>", self.showStatus)
+                if (column == 0) or (column == 6):
+                    day_btn.config(fg='red')
+                self.day_btns.append(day_btn)
+
+        self.status_var = tk.StringVar()
+        status_lbl = tk.Label(self, textvariable=self.status_var, font="Times 11 italic", anchor=tk.W)
+        status_lbl.pack(fill=tk.X)
+        legend_frame = tk.Frame(self)
+        legend_frame.pack(fill=tk.X)
+        for text, color in (('Nothing', 'white'), ('Some projects', self.PARTIAL_COLOR),
+                            ('All projects', self.COMPLETE_COLORS[1])):
+            tk.Label(legend_frame, text=text, bg=color, relief=tk.GROOVE,
+                     font="Times 10 normal").pack(side=tk.LEFT, expand=True, fill=tk.X)
+
+        self.statuses = {}
         self.updateCalendar()
         self.focus_set()
 
     def updateCalendar(self):
-        children = self.days_frame.winfo_children()
-        if len(children) != 0:
-            for child in children:
-                child.destroy()
-
-        days = ["Sun", "Mon", "Tue",
-                "Wed", "Thu", "Fri",
-                "Sat"]
-        month = ["January", "February", "March",
-                 "April", "May", "June",
-                 "July", "August", "September",
-                 "October", "November", "December"]
-
-        self.month_var.set(month[self.month-1]+" "+str(self.year))
-        list_of_days = self.cal.monthdayscalendar(self.year, self.month)
-        list_of_days.insert(0, days)
-
-        for idx, week in enumerate(list_of_days):
-            for idx1, day in enumerate(week):
-                if day == 0:
-                    self.day_lbl = tk.Label(self.days_frame, text=str(""),
-                                            relief=tk.RAISED,
-                                            state="disabled",
-                                            font="Times 12 normal",
-                                            bg="white")
-                    self.day_lbl.grid(row=idx, column=idx1, sticky="nesw")
-                elif day in days:
-                    self.day_lbl = tk.Label(self.days_frame,
-                                            text=str(day), relief=tk.RAISED,
-                                            font="Times 12 bold")
-                    self.day_lbl.grid(row=idx, column=idx1, sticky="nesw")
-                    if (day == "Sun") or (day == "Sat"):
-                        self.day_lbl.config(fg="red")
-                else:
-                    self.day_btn = tk.Button(self.days_frame, text=str(day),
-                                             width=3, font="Times 12 normal",
-                                             bg="white")
-                    self.day_btn.grid(row=idx, column=idx1, sticky="nesw")
-                    self.day_btn.bind("<Button-1>", self.printEvent)
-                    if (idx1 == 0) or (idx1 == 6):
-                        self.day_btn.config(fg='red')
+        self.month_var.set(self.MONTH_NAMES[self.month-1]+" "+str(self.year))
+        days = [day for week in self.cal.monthdayscalendar(self.year, self.month) for day in week]
+        days += [0] * (len(self.day_btns) - len(days))
+        for day_btn, day in zip(self.day_btns, days):
+            if day == 0:
+                day_btn.config(text="", state=tk.DISABLED, bg="white")
+            else:
+                day_btn.config(text=str(day), state=tk.NORMAL, bg="white")
+        self.statuses = {}
+        self.status_var.set("")
+        get_executor(self).submit(month_status, self.year, self.month, callback=self.showMonth,
+                                  key=str(self), owner=self)
+
+    def showMonth(self, statuses):
+        """Color each day by how many projects were entered, compared
+        with the busiest day of the month, and by its manpower."""
+        self.statuses = statuses
+        if len(statuses) == 0:
+            return
+        projects = max(status.projects for status in statuses.values())
+        headcount = max(status.headcount for status in statuses.values())
+        for day_btn in self.day_btns:
+            status = statuses.get(int(day_btn.cget("text") or 0))
+            if status is None:
+                continue
+            if status.projects < projects:
+                day_btn.config(bg=self.PARTIAL_COLOR)
+            else:
+                share = status.headcount / headcount if headcount else 0
+                day_btn.config(bg=mix_color(*self.COMPLETE_COLORS, share))
+
+    def showStatus(self, event):
+        day = event.widget.cget("text")
+        if day == "":
+            self.status_var.set("")
+            return
+        status = self.statuses.get(int(day))
+        date = "%02d/%02d/%s" % (int(day), self.month, self.year)
+        if status is None:
+            self.status_var.set(f"{date}: nothing entered")
+        else:
+            self.status_var.set(f"{date}: {status.projects} project(s), {status.headcount} manpower")
 
     def printEvent(self, event):
-        if event.widget.winfo_class() == "Button":
+        if event.widget.winfo_class() == "Button" and event.widget.cget("text") != "":
             day = event.widget.cget("text")
             self.date = "%s/%s/%s" % ("{:02}".format(int(day)),
                                       "{:02}".format(self.month),
@@ -1452,10 +2228,52 @@ class CalendarWidget(tk.Frame):
         self.master.destroy()
 # End of CalendarWidget class
 
+def open_database(session):
+    """Executor job of MainWindow.connect_database. The session is not
+    used, it is not bound before init_db() returns."""
+    return init_db()
+
+def rebuild_rollup():
+    """Refill the daily rollup table from the whole transaction history."""
+    init_db()
+    with session_scope() as session:
+        count = rollup.rebuild(session)
+    print(f'Rebuilt {count} rollup row(s).')
+
+def print_startup_time():
+    """Print how long each startup stage took, in the same layout as
+    python -X importtime, plus the heavy modules loaded on the way."""
+    print('startup time: self [ms] | cumulative | stage', file=sys.stderr)
+    first = STARTUP[0][1]
+    previous = first
+    for stage, moment in STARTUP[1:]:
+        print(f'startup time: {(moment-previous)*1000:9.1f} | {(moment-first)*1000:10.1f} | {stage}', file=sys.stderr)
+        previous = moment
+    # These are meant to be loaded only when a report is made.
+    lazy = ('reports', 'fpdf', 'openpyxl', 'webbrowser')
+    loaded = [name for name in lazy if name in sys.modules]
+    print(f'startup time: eagerly loaded: {", ".join(loaded) or "none"}', file=sys.stderr)
+
 def main():
+    global PROFILE
+    args = sys.argv[1:]
+    if args in (['rebuild-rollup'], ['check-db']):
+        try:
+            if args == ['rebuild-rollup']:
+                rebuild_rollup()
+            else:
+                for name, value in check_database():
+                    print(f'{name:<8} {value}')
+        except CONNECT_ERRORS as error:
+            print(error_message(error), file=sys.stderr)
+            return 2
+        return
+    PROFILE = '--profile' in args or os.environ.get('MANPOWER_PROFILE', '') not in ('', '0')
     root = tk.Tk()
     win = MainWindow(root)
     win.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+    STARTUP.append(('main window', time.perf_counter()))
+    root.after_idle(win.connect_database, print_startup_time if '--startup-time' in args else None)
     root.mainloop()
 
 if __name__ == '__main__':
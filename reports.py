@@ -0,0 +1,304 @@
+#!/usr/bin/python3
+"""Report and export writers shared by the windows of manpower.py.
+
+Nothing here imports tkinter so the same reports can be generated on a
+server from the command line:
+
+    python -m manpower report --from 01/06/2022 --to 30/06/2022 --format pdf
+"""
+
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import groupby
+
+from fpdf import FPDF
+from openpyxl import Workbook
+
+from dtbase.history import iter_details
+from dtbase.summary import summary_range
+
+DETAIL_HEADING = ('Date', 'Project', 'Designation', 'Present', 'Absent', 'Vacation', 'Total', 'Remarks')
+SUMMARY_HEADING = ('S. No.', 'Project', 'Present', 'Absent', 'Vacation', 'Total', 'Remarks')
+RANGE_HEADING = ('Present', 'Absent', 'Vacation', 'Total', 'Days', 'Average', 'Peak')
+
+
+# Start of PDF class
+class PDF(FPDF):
+    report_title = 'Daily Manpower Report'
+
+    def header(self):
+        self.set_font('Times', 'B', 20)
+        self.cell(0, 10, 'Al Hamra Construction Co. LLC', 0, 1, 'C')
+        self.set_font('Times', 'I', 17)
+        self.cell(0, 20, self.report_title, 0, 1, 'C')
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, 'Page ' + str(self.page_no()) + ' of {nb}', 0, 0, 'C')
+# End of PDF class
+
+
+def write_summary_pdf(filename, date_label, rows):
+    """Write the daily summary rows of one date to a PDF file."""
+    pdf = PDF('L')
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    pdf.set_font('Times', '', 12)
+    pdf.cell(0, 10, 'Date: '+date_label, 0, 1)
+    pdf.set_font('Times', 'BI', 12)
+    pdf.set_fill_color(86, 159, 169)
+    pdf.set_text_color(255, 255, 255)
+    pdf.cell(20, 10, 'Sl. No.', 1, 0, 'C', True)
+    pdf.cell(70, 10, 'Project', 1, 0, 'C', True)
+    pdf.cell(28, 10, 'Present', 1, 0, 'C', True)
+    pdf.cell(28, 10, 'Absent', 1, 0, 'C', True)
+    pdf.cell(28, 10, 'Vacation', 1, 0, 'C', True)
+    pdf.cell(28, 10, 'Total', 1, 0, 'C', True)
+    pdf.cell(0, 10, 'Remarks', 1, 1, 'C', True)
+    pdf.set_font('Times', '', 12)
+    pdf.set_text_color(0, 0, 0)
+    counter = 1
+    sum_pre = 0
+    sum_abs = 0
+    sum_vac = 0
+    for row in rows:
+        if counter % 2 == 0:
+            pdf.set_fill_color(152, 211, 219)
+        else:
+            pdf.set_fill_color(195, 223, 227)
+        pdf.cell(20, 8, f'{counter}', 1, 0, 'C', True)
+        pdf.cell(70, 8, row.project, 1, 0, '', True)
+        pdf.cell(28, 8, f'{row.present}', 1, 0, 'C', True)
+        pdf.cell(28, 8, f'{row.absent}', 1, 0, 'C', True)
+        pdf.cell(28, 8, f'{row.vacation}', 1, 0, 'C', True)
+        total = row.present + row.absent + row.vacation
+        pdf.cell(28, 8, f'{total}', 1, 0, 'C', True)
+        pdf.cell(0, 8, row.remarks, 1, 1, 'C', True)
+        sum_pre+=row.present
+        sum_abs+=row.absent
+        sum_vac+=row.vacation
+        counter+=1
+    pdf.set_font('Times', 'BI', 12)
+    if counter % 2 == 0:
+        pdf.set_fill_color(152, 211, 219)
+    else:
+        pdf.set_fill_color(195, 223, 227)
+    pdf.cell(20, 10, '', 1, 0, 'C', True)
+    pdf.cell(70, 10, 'Total', 1, 0, 'C', True)
+    pdf.cell(28, 10, f'{sum_pre}', 1, 0, 'C', True)
+    pdf.cell(28, 10, f'{sum_abs}', 1, 0, 'C', True)
+    pdf.cell(28, 10, f'{sum_vac}', 1, 0, 'C', True)
+    pdf.cell(28, 10, f'{sum_pre+sum_abs+sum_vac}', 1, 0, 'C', True)
+    pdf.cell(0, 10, '', 1, 1, 'C', True)
+    pdf.output(filename, 'F')
+
+
+def _range_cells(line):
+    total = line.present + line.absent + line.vacation
+    return (line.present, line.absent, line.vacation, total, line.days, line.average, line.peak)
+
+
+def write_range_pdf(filename, report):
+    """Write the totals of a range report to a PDF file, each project
+    followed by its designations."""
+    pdf = PDF('L')
+    pdf.report_title = 'Manpower Report'
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    pdf.set_font('Times', '', 12)
+    pdf.cell(0, 10, f'From: {report.date_from:%d/%m/%Y}  To: {report.date_to:%d/%m/%Y}', 0, 1)
+    pdf.set_font('Times', 'BI', 12)
+    pdf.set_fill_color(86, 159, 169)
+    pdf.set_text_color(255, 255, 255)
+    pdf.cell(90, 10, 'Project / Designation', 1, 0, 'C', True)
+    for heading in RANGE_HEADING[:-1]:
+        pdf.cell(26, 10, heading, 1, 0, 'C', True)
+    pdf.cell(0, 10, RANGE_HEADING[-1], 1, 1, 'C', True)
+    pdf.set_text_color(0, 0, 0)
+    lines = groupby(report.lines, key=lambda line: line.project)
+    designations = {project: list(rows) for project, rows in lines}
+    for project in report.projects:
+        pdf.set_font('Times', 'B', 12)
+        pdf.set_fill_color(152, 211, 219)
+        rows = [(project.project, project)]
+        rows += [('    '+line.designation, line) for line in designations.get(project.project, [])]
+        for counter, (label, line) in enumerate(rows):
+            if counter == 1:
+                pdf.set_font('Times', '', 12)
+                pdf.set_fill_color(195, 223, 227)
+            pdf.cell(90, 8, label, 1, 0, '', True)
+            cells = _range_cells(line)
+            for cell in cells[:-1]:
+                pdf.cell(26, 8, f'{cell}', 1, 0, 'C', True)
+            pdf.cell(0, 8, f'{cells[-1]}', 1, 1, 'C', True)
+    pdf.output(filename, 'F')
+
+
+def range_sheets(report):
+    """Return the (title, heading, rows) sheets of a range report."""
+    projects = [(line.project,) + _range_cells(line) for line in report.projects]
+    lines = [(line.project, line.designation) + _range_cells(line) for line in report.lines]
+    return [('Projects', ('Project',) + RANGE_HEADING, projects),
+            ('Designations', ('Project', 'Designation') + RANGE_HEADING, lines)]
+
+
+def write_xlsx(filename, sheets):
+    """Write sheets to an excel file using openpyxl write-only mode.
+
+    sheets is an iterable of (title, heading, rows) and rows may be any
+    iterable, including a generator reading from the database. Each row
+    is written out as soon as it is appended so memory use does not grow
+    with the number of rows.
+    """
+    wb = Workbook(write_only=True)
+    for title, heading, rows in sheets:
+        ws = wb.create_sheet(title)
+        ws.append(heading)
+        for row in rows:
+            ws.append(row)
+    # A write-only workbook without any sheet can not be saved.
+    if len(wb.worksheets) == 0:
+        wb.create_sheet('Sheet')
+    wb.save(filename)
+
+
+def summary_sheet_rows(rows):
+    """Turn daily summary rows into numbered excel rows."""
+    for counter, row in enumerate(rows, 1):
+        total = row.present + row.absent + row.vacation
+        yield (counter, row.project, row.present, row.absent, row.vacation, total, row.remarks)
+
+
+def detail_sheet_rows(rows):
+    for row in rows:
+        total = row.present + row.absent + row.vacation
+        yield (row.tr_date.date(), row.project, row.designation,
+               row.present, row.absent, row.vacation, total, row.remarks)
+
+
+def export_range(session, filename, date_from, date_to, per_month=True):
+    """Export every detail row between two dates to an excel file.
+
+    With per_month each calendar month gets its own sheet, otherwise all
+    rows go in one long sheet. Rows are streamed from the database
+    straight into the file.
+    """
+    details = iter_details(session, date_from, date_to)
+    if per_month:
+        months = groupby(details, key=lambda row: row.tr_date.strftime('%Y-%m'))
+        sheets = ((month, DETAIL_HEADING, detail_sheet_rows(rows)) for month, rows in months)
+    else:
+        sheets = [('Manpower', DETAIL_HEADING, detail_sheet_rows(details))]
+    write_xlsx(filename, sheets)
+
+
+def write_summary_csv(filename, days):
+    """Write the daily summaries of several dates to one csv file.
+
+    days is an iterable of (date, rows) as returned by collect_summaries.
+    """
+    with open(filename, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(('Date',) + SUMMARY_HEADING)
+        for tr_date, rows in days:
+            for row in summary_sheet_rows(rows):
+                writer.writerow((tr_date.strftime('%d/%m/%Y'),) + row)
+
+
+def collect_summaries(session, date_from, date_to):
+    """Return (date, rows) for every day of the range that has entries,
+    read with the two queries of summary_range()."""
+    summaries = summary_range(session, date_from, date_to)
+    return [(tr_date, rows) for tr_date, rows in sorted(summaries.items()) if len(rows) != 0]
+
+
+def _render_pdf(filename, date_label, rows):
+    write_summary_pdf(filename, date_label, rows)
+    return filename
+
+
+def render_pdfs(days, output_dir, workers=None):
+    """Write one summary PDF per day, rendering them in parallel.
+
+    The rows are read from the database beforehand so the worker
+    processes only do the PDF layout and never touch the database.
+    Returns the list of files written.
+    """
+    jobs = []
+    for tr_date, rows in days:
+        filename = os.path.join(output_dir, f'ManpowerSummary-{tr_date:%d%m%Y}.pdf')
+        jobs.append((filename, tr_date.strftime('%d/%m/%Y'), rows))
+    if workers == 1 or len(jobs) < 2:
+        return [_render_pdf(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_pdf, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%d/%m/%Y')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{value} is not a dd/mm/yyyy date')
+
+
+def main(argv=None):
+    """Command line entry point of the headless report generator."""
+    parser = argparse.ArgumentParser(prog='manpower report',
+                                     description='Generate daily manpower reports without the user interface.')
+    parser.add_argument('--from', dest='date_from', type=parse_date, required=True,
+                        help='first date of the report, dd/mm/yyyy')
+    parser.add_argument('--to', dest='date_to', type=parse_date,
+                        help='last date of the report, dd/mm/yyyy (default: same as --from)')
+    parser.add_argument('--format', choices=('pdf', 'xlsx', 'csv'), default='pdf')
+    parser.add_argument('--output', default='.',
+                        help='directory where the reports are written (default: current directory)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of processes rendering PDFs (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    date_to = args.date_to or args.date_from
+    if date_to < args.date_from:
+        parser.error('--to is before --from')
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+
+    from dtbase.connection import CONNECT_ERRORS, init_db, session_scope, error_message
+    try:
+        init_db()
+        with session_scope() as session:
+            days = collect_summaries(session, args.date_from, date_to)
+    except CONNECT_ERRORS as error:
+        print(error_message(error), file=sys.stderr)
+        return 2
+
+    if len(days) == 0:
+        print('No manpower recorded in the given dates.', file=sys.stderr)
+        return 1
+
+    span = f'{args.date_from:%d-%m-%Y}-to-{date_to:%d-%m-%Y}'
+    if args.format == 'pdf':
+        files = render_pdfs(days, args.output, args.workers)
+    elif args.format == 'xlsx':
+        filename = os.path.join(args.output, f'Manpower-{span}.xlsx')
+        sheets = ((f'{tr_date:%d-%m-%Y}', SUMMARY_HEADING, summary_sheet_rows(rows))
+                  for tr_date, rows in days)
+        write_xlsx(filename, sheets)
+        files = [filename]
+    else:
+        filename = os.path.join(args.output, f'Manpower-{span}.csv')
+        write_summary_csv(filename, days)
+        files = [filename]
+
+    for filename in files:
+        print(filename)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
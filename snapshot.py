@@ -0,0 +1,246 @@
+"""Columnar snapshot of the daily rollup kept on disk.
+
+Each column of the rollup (day ordinal, project id, designation id,
+present, absent and vacation) is a file of little-endian int32 under
+~/.manpower_mngt/snapshot, and meta.json tells the format version, the
+database it was taken from, the generation of the files and the number
+of rows. open_arrays() maps the files with numpy.memmap without running
+any query, so the analytics can start from the last snapshot at once.
+
+update() brings the snapshot in step with the database. A fingerprint of
+each day (row count and sums weighted by project and designation) is
+compared between the files and one grouped query, and only the rows
+from the first day that differs are read again. When these are all
+after the last day of the snapshot, the usual case of days entered
+since the last update, they are appended to the files and meta.json
+counts them. Arrays mapped earlier, perhaps by another thread, end
+before the appended rows and do not change. When a day already written
+changed, the kept rows and the new ones go to the files of a new
+generation and meta.json is switched to them last. Older files are
+removed once nothing maps them any more, Windows refuses before.
+Updates take a lock file, so the application and a report run at the
+same time do not write the same files.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from dtbase.connection import HOME_DIR
+from dtbase.dtbase import DailyRollup
+
+SNAPSHOT_DIR = os.path.join(HOME_DIR, 'snapshot')
+# Bumped whenever the layout of the files changes, older snapshots are
+# then written again from scratch.
+FORMAT = 2
+COLUMNS = ('day', 'project', 'designation', 'present', 'absent', 'vacation')
+DTYPE = np.dtype('<i4')
+
+
+def _column_file(folder, name, generation):
+    return os.path.join(folder, f'{name}.{generation}.i32')
+
+
+def _source(session_or_url):
+    """Return the url of a database, without its password."""
+    url = session_or_url if isinstance(session_or_url, str) else str(session_or_url.get_bind().url)
+    return make_url(url).render_as_string(hide_password=True)
+
+
+def read_meta(folder=None):
+    """Return the meta data of the snapshot, or None if there is no
+    snapshot of the current format."""
+    folder = folder or SNAPSHOT_DIR
+    try:
+        with open(os.path.join(folder, 'meta.json'), encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != FORMAT:
+        return None
+    return meta
+
+
+def _write_meta(folder, source, generation, rows):
+    meta = {'format': FORMAT, 'source': source, 'generation': generation, 'rows': rows,
+            'updated': datetime.now().isoformat(timespec='seconds')}
+    temp = os.path.join(folder, 'meta.json.tmp')
+    with open(temp, 'w', encoding='utf-8') as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(temp, os.path.join(folder, 'meta.json'))
+
+
+def _empty():
+    return tuple(np.empty(0, DTYPE) for _ in COLUMNS)
+
+
+def open_arrays(url=None, folder=None):
+    """Map the columns of the snapshot read-only, in COLUMNS order.
+
+    Returns None when there is no usable snapshot, or when url is given
+    and the snapshot was taken from another database.
+    """
+    folder = folder or SNAPSHOT_DIR
+    meta = read_meta(folder)
+    if meta is None or (url is not None and meta.get('source') != _source(url)):
+        return None
+    rows = meta['rows']
+    if rows == 0:
+        return _empty()
+    try:
+        return tuple(np.memmap(_column_file(folder, name, meta['generation']), dtype=DTYPE,
+                               mode='r', shape=(rows,))
+                     for name in COLUMNS)
+    except (OSError, ValueError):
+        # A column file is missing or shorter than meta.json says.
+        return None
+
+
+def _weights(project, designation, values):
+    """Return the terms summed per day by the fingerprint. They are the
+    same expressions on NumPy arrays and on columns in SQL. Moving
+    manpower of any kind between projects or designations changes at
+    least one of them, the products catch moves that keep the sums per
+    project and per designation."""
+    terms = []
+    for value in values:
+        terms += [value, designation * value, project * value, project * designation * value]
+    return terms
+
+
+def _fingerprints(day, project, designation, present, absent, vacation):
+    """Return the days of the arrays and a fingerprint row of each."""
+    days, inverse = np.unique(day, return_inverse=True)
+    project = project.astype(np.int64)
+    designation = designation.astype(np.int64)
+    values = [column.astype(np.int64) for column in (present, absent, vacation)]
+    weights = [None] + _weights(project, designation, values)
+    prints = np.stack([np.bincount(inverse, weights=weight, minlength=len(days))
+                       for weight in weights], axis=1).astype(np.int64)
+    return days, prints
+
+
+def _database_fingerprints(session):
+    """Return the same fingerprints as _fingerprints() for the rollup,
+    with one grouped query."""
+    terms = _weights(DailyRollup.project_id, DailyRollup.designation_id,
+                     (DailyRollup.present, DailyRollup.absent, DailyRollup.vacation))
+    records = session.execute(select(DailyRollup.tr_date, func.count(), *(func.sum(term) for term in terms))
+                              .group_by(DailyRollup.tr_date)
+                              .order_by(DailyRollup.tr_date)).all()
+    days = np.array([record[0].toordinal() for record in records], dtype=np.int64)
+    prints = np.array([record[1:] for record in records], dtype=np.int64).reshape(-1, len(terms) + 1)
+    return days, prints
+
+
+def _first_change(old_days, old_prints, new_days, new_prints):
+    """Return the first day ordinal that differs, or None."""
+    count = min(len(old_days), len(new_days))
+    same = (old_days[:count] == new_days[:count]) & (old_prints[:count] == new_prints[:count]).all(axis=1)
+    if not same.all():
+        index = int(np.argmin(same))
+        return int(min(old_days[index], new_days[index]))
+    if len(old_days) > count:
+        return int(old_days[count])
+    if len(new_days) > count:
+        return int(new_days[count])
+    return None
+
+
+def _read_rows(session, day_from):
+    records = session.execute(select(DailyRollup.tr_date, DailyRollup.project_id,
+                                     DailyRollup.designation_id, DailyRollup.present,
+                                     DailyRollup.absent, DailyRollup.vacation)
+                              .filter(DailyRollup.tr_date >= datetime.fromordinal(day_from))
+                              .order_by(DailyRollup.tr_date, DailyRollup.project_id,
+                                        DailyRollup.designation_id)).all()
+    day = np.fromiter((record[0].toordinal() for record in records), dtype=DTYPE, count=len(records))
+    values = np.array([record[1:] for record in records], dtype=DTYPE).reshape(-1, 5)
+    return (day,) + tuple(values[:, column] for column in range(5))
+
+
+def _remove_old_files(folder, generation):
+    current = f'.{generation}.i32'
+    for filename in os.listdir(folder):
+        if filename.endswith('.i32') and not filename.endswith(current):
+            try:
+                os.remove(os.path.join(folder, filename))
+            except OSError:
+                # Still mapped on Windows, removed by a later update.
+                pass
+
+
+@contextmanager
+def _locked(folder):
+    """Hold the lock file of the snapshot in folder, waiting for other
+    processes or threads holding it."""
+    with open(os.path.join(folder, 'lock'), 'a+b') as lock_file:
+        if os.name == 'nt':
+            import msvcrt
+            lock_file.seek(0)
+            # Retries for 10 seconds, then raises OSError.
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _append(folder, generation, rows, new_rows):
+    """Write new_rows after the first rows rows of the files of
+    generation."""
+    for name, new in zip(COLUMNS, new_rows):
+        with open(_column_file(folder, name, generation), 'r+b') as column_file:
+            # Anything past rows was left by an update that did not finish.
+            column_file.seek(rows * DTYPE.itemsize)
+            column_file.write(new.astype(DTYPE).tobytes())
+            column_file.truncate()
+
+
+def _write_generation(folder, generation, arrays, kept, new_rows):
+    for name, old, new in zip(COLUMNS, arrays, new_rows):
+        with open(_column_file(folder, name, generation), 'wb') as column_file:
+            column_file.write(np.asarray(old[:kept], dtype=DTYPE).tobytes())
+            column_file.write(new.astype(DTYPE).tobytes())
+
+
+def update(session, folder=None):
+    """Bring the snapshot in step with the rollup of the database of
+    session and return its columns, see open_arrays(). Arrays returned
+    before stay valid but keep the old rows, reopen to see the new
+    ones."""
+    folder = folder or SNAPSHOT_DIR
+    source = _source(session)
+    os.makedirs(folder, exist_ok=True)
+    with _locked(folder):
+        current = open_arrays(source, folder)
+        arrays = current if current is not None else _empty()
+        changed = _first_change(*_fingerprints(*arrays), *_database_fingerprints(session))
+        if changed is None:
+            return arrays
+
+        meta = read_meta(folder)
+        kept = int(np.searchsorted(arrays[0], changed, 'left'))
+        rows = _read_rows(session, changed)
+        if current is not None and 0 < kept == len(current[0]):
+            generation = meta['generation']
+            _append(folder, generation, kept, rows)
+        else:
+            generation = meta.get('generation', 0) + 1 if meta is not None else 1
+            _write_generation(folder, generation, arrays, kept, rows)
+        _write_meta(folder, source, generation, kept + len(rows[0]))
+        _remove_old_files(folder, generation)
+        return open_arrays(source, folder)
@@ -0,0 +1,60 @@
+"""Searching project and designation names and remarks.
+
+    python -m unittest discover tests
+"""
+
+import unittest
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from dtbase.connection import make_engine
+from dtbase.dtbase import Project, Designation, Transaction
+from dtbase.migrate import upgrade
+from dtbase.lookup import search_names
+from dtbase.search import SEARCH_TABLE, has_search_index, search_transactions
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = make_engine('sqlite://')
+        upgrade(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([Project(id=1, name='Construction Site'), Project(id=2, name='Main Office'),
+                              Designation(id=1, name='Steel Fixer'), Designation(id=2, name='Helper')])
+        self.session.add(Transaction(tr_date=datetime(2022, 6, 1), project_id=2, remarks='Rain stopped work'))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_uses_search_index(self):
+        with self.engine.connect() as conn:
+            version = conn.execute(text('SELECT sqlite_version()')).scalar()
+        if tuple(int(part) for part in version.split('.')[:2]) < (3, 34):
+            self.skipTest('SQLite without the trigram tokenizer')
+        self.assertTrue(has_search_index(self.session))
+        with self.engine.connect() as conn:
+            sql = conn.execute(text('SELECT sql FROM sqlite_master WHERE name = :name'),
+                               {'name': SEARCH_TABLE}).scalar()
+        self.assertIn('trigram', sql)
+
+    def test_middle_of_word(self):
+        self.assertEqual(search_names(self.session, Project, 'struct'), [(1, 'Construction Site')])
+        self.assertEqual(search_names(self.session, Designation, 'EEL FIX'), [(1, 'Steel Fixer')])
+        self.assertEqual(search_names(self.session, Designation, 'elpe'), [(2, 'Helper')])
+
+    def test_short_text(self):
+        self.assertEqual(search_names(self.session, Project, 'ff'), [(2, 'Main Office')])
+        self.assertEqual(search_names(self.session, Project, ' '), [(1, 'Construction Site'), (2, 'Main Office')])
+
+    def test_transactions(self):
+        self.assertEqual([hit.remarks for hit in search_transactions(self.session, 'topped')],
+                         ['Rain stopped work'])
+        self.assertEqual([hit.project for hit in search_transactions(self.session, 'ffic')], ['Main Office'])
+
+
+if __name__ == '__main__':
+    unittest.main()